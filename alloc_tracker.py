@@ -0,0 +1,194 @@
+"""
+メモリ確保の計測モード（長時間プレイでオブジェクトが溜まっていないかを調べる）
+エンティティのクラス（Bullet, Enemy, Boss, Player とその子クラス）ごとの生存インスタンス数とバイト数、
+フレームごとの pygame.Surface の作成数を数え、予算（上限）を超えたら報告する
+tracemalloc のスナップショットを取って、どの行でメモリが増えたかも調べられる
+
+install() でクラスの __init__ と pygame.Surface を差し替えるので、計測するときだけ使う
+（Surface の作成数は Python から pygame.Surface(...) を呼んだ分だけ。読み込みや変換で作られた画像は数えない）
+
+    tracker = AllocTracker()
+    tracker.install()
+    ...
+    game.step(mask)
+    tracker.end_frame()
+    ...
+    print(tracker.check())
+"""
+import gc
+import sys
+import tracemalloc
+import weakref
+from collections import Counter
+
+import pygame
+
+import game as game_module
+
+# 数えるエンティティのクラス（子クラスは親クラスの名前でまとめて数える）
+TRACKED_CLASSES = {
+    "Bullet": game_module.Bullet,
+    "Enemy": game_module.Enemy,
+    "Boss": game_module.Boss,
+    "Player": game_module.Player,
+}
+
+# 標準の予算: クラスごとの生存インスタンス数の上限と、1フレームに作ってよい Surface の数
+DEFAULT_BUDGETS = {
+    "Bullet": 2000,
+    "Enemy": 600,
+    "Boss": 2,
+    "Player": 2,
+    "surfaces_per_frame": 4,
+}
+
+
+def instance_bytes(obj:object) -> int:
+    """
+    インスタンス本体と属性の辞書のバイト数（属性が指す先のオブジェクトは含めない）
+    """
+    size = sys.getsizeof(obj)
+    attrs = getattr(obj, "__dict__", None)
+    if attrs is not None:
+        size += sys.getsizeof(attrs)
+    return size
+
+
+class AllocTracker:
+    """
+    エンティティの生存数・バイト数と Surface の作成数を数えるクラス
+    """
+    def __init__(self, budgets:dict | None=None) -> None:
+        """
+        引数 budgets: 予算（DEFAULT_BUDGETS と同じ形。指定したものだけ上書きする）
+        """
+        self.budgets = dict(DEFAULT_BUDGETS)
+        if budgets:
+            self.budgets.update(budgets)
+        self.live = {name: weakref.WeakSet() for name in TRACKED_CLASSES} # {クラス名: 生存インスタンス}
+        self.frame_surfaces = 0  # このフレームに作った Surface の数
+        self.peak_surfaces = 0   # 1フレームに作った Surface の最大数
+        self.peak_frame = 0      # その最大のフレーム（end_frame() を呼んだ回数）
+        self.frames = 0
+        self.total_surfaces = 0
+        self.baseline = None     # 最初に取った tracemalloc のスナップショット
+        self._originals = {}
+
+    def install(self) -> None:
+        """
+        計測を始める（エンティティの __init__ と pygame.Surface を数える版に差し替える）
+        """
+        if self._originals:
+            return
+        for name, cls in TRACKED_CLASSES.items():
+            self._originals[cls] = cls.__init__
+            cls.__init__ = self._wrap_init(cls.__init__, self.live[name])
+
+        tracker = self
+        original_surface = pygame.Surface
+
+        class CountingSurface(original_surface):
+            """
+            作成数を数える Surface
+            """
+            def __init__(self, *args, **kwargs) -> None:
+                super().__init__(*args, **kwargs)
+                tracker.frame_surfaces += 1
+
+        self._originals[pygame] = original_surface
+        pygame.Surface = CountingSurface
+
+    @staticmethod
+    def _wrap_init(init, registry:weakref.WeakSet):
+        """
+        __init__ の最後にインスタンスを登録する版を返す
+        """
+        def __init__(self, *args, **kwargs):
+            init(self, *args, **kwargs)
+            registry.add(self)
+        __init__.__wrapped__ = init
+        return __init__
+
+    def uninstall(self) -> None:
+        """
+        計測をやめて元に戻す
+        """
+        for owner, original in self._originals.items():
+            if owner is pygame:
+                pygame.Surface = original
+            else:
+                owner.__init__ = original
+        self._originals = {}
+
+    def end_frame(self) -> None:
+        """
+        フレームの終わりに呼ぶ（このフレームの Surface の作成数を締める）
+        """
+        self.frames += 1
+        self.total_surfaces += self.frame_surfaces
+        if self.frame_surfaces > self.peak_surfaces:
+            self.peak_surfaces = self.frame_surfaces
+            self.peak_frame = self.frames
+        self.frame_surfaces = 0
+
+    def reset_peak(self) -> None:
+        """
+        1フレームの Surface の作成数の最大を数え直す（キャラを替えて測り直すときなど）
+        """
+        self.peak_surfaces = 0
+        self.peak_frame = self.frames
+
+    def census(self) -> dict:
+        """
+        クラスごとの生存インスタンス数とバイト数を数える（循環参照のごみを回収してから数える）
+        戻り値: {クラス名: {"live": 数, "bytes": バイト数, "by_class": {子クラス名: 数}}}
+        """
+        gc.collect()
+        result = {}
+        for name, registry in self.live.items():
+            objs = list(registry)
+            result[name] = {
+                "live": len(objs),
+                "bytes": sum(instance_bytes(obj) for obj in objs),
+                "by_class": dict(Counter(type(obj).__name__ for obj in objs)),
+            }
+        result["Bullet"]["pooled"] = len(game_module.Bullet.pool)
+        return result
+
+    def check(self, census:dict | None=None) -> list:
+        """
+        予算を超えているものを調べる
+        引数 census: census() の結果（省略時は数え直す）
+        戻り値: 超えたものの説明のリスト
+        """
+        census = census or self.census()
+        problems = []
+        for name, info in census.items():
+            limit = self.budgets.get(name)
+            if limit is not None and info["live"] > limit:
+                problems.append(f"{name} の生存インスタンスが {info['live']} 個（予算 {limit}）: {info['by_class']}")
+        limit = self.budgets.get("surfaces_per_frame")
+        if limit is not None and self.peak_surfaces > limit:
+            problems.append(f"1フレームに Surface を {self.peak_surfaces} 個作った（{self.peak_frame} フレーム目、予算 {limit}）")
+        return problems
+
+    def snapshot(self, path:str | None=None, top:int=10) -> list:
+        """
+        tracemalloc のスナップショットを取り、最初のスナップショットから増えた行を返す
+        （tracemalloc が止まっていればここから始め、このときのスナップショットを基準にする）
+        引数 path: 指定するとスナップショットをファイルに保存する（tracemalloc.Snapshot.load で読める）
+        引数 top: 返す行数
+        戻り値: 増えた量の多い順の tracemalloc.StatisticDiff のリスト（基準を取っただけのときは空）
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        if path:
+            snap.dump(path)
+        if self.baseline is None:
+            self.baseline = snap
+            return []
+        return snap.compare_to(self.baseline, "lineno")[:top]
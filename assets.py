@@ -0,0 +1,175 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pygame
+
+# 加工済み画像の保存先
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".asset_cache")
+
+# 加工処理の版。処理内容を変えたら上げて古いキャッシュを使わないようにする
+PIPELINE_VERSION = 1
+
+# 読み込んだ（または読み込み中の）加工済み画像 {(加工の関数名, 元画像のパス, 加工の引数): Future}
+# 先読みのスレッドと同じ画像を二重に読み込まないよう、読み込み中のものは終わるのを待って同じ画像を使う
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def to_alpha(image:pygame.Surface) -> pygame.Surface:
+    """
+    アルファ付きの画像に変換する
+    画面がまだない（Game をウィンドウなしで動かしている）ときは画面の形式に合わせられないので、32bitのアルファ付き画像に写す
+    引数 image: 変換する画像
+    """
+    if pygame.display.get_surface() is not None:
+        return image.convert_alpha()
+    converted = pygame.Surface(image.get_size(), pygame.SRCALPHA, 32)
+    converted.blit(image, (0, 0))
+    return converted
+
+
+def strip_near_color(image:pygame.Surface, color:tuple, threshold:int) -> None:
+    """
+    指定色に近いピクセルを完全に透明 (0, 0, 0, 0) にする（画像を直接書き換える）
+    引数 image: アルファ付きの画像
+    引数 color: 消す色（背景色）
+    引数 threshold: RGBの差の合計がこれ未満なら消す
+    """
+    rgb = pygame.surfarray.pixels3d(image)
+    alpha = pygame.surfarray.pixels_alpha(image)
+    diff = np.abs(rgb.astype(np.int16) - np.array(color[:3], dtype=np.int16)).sum(axis=2)
+    hit = diff < threshold
+    rgb[hit] = 0
+    alpha[hit] = 0
+    del rgb, alpha # 画像のロックを解除する
+
+
+def strip_bright(image:pygame.Surface, threshold:int) -> None:
+    """
+    白っぽいピクセルを透明な白 (255, 255, 255, 0) にする（画像を直接書き換える）
+    引数 image: アルファ付きの画像
+    引数 threshold: R,G,B がすべてこれより大きければ消す
+    """
+    rgb = pygame.surfarray.pixels3d(image)
+    alpha = pygame.surfarray.pixels_alpha(image)
+    hit = (rgb > threshold).all(axis=2)
+    rgb[hit] = 255
+    alpha[hit] = 0
+    del rgb, alpha
+
+
+def load_cached(path:str, params:tuple, build) -> pygame.Surface:
+    """
+    加工済み画像を返す（一度読み込んだ画像はメモリに残して使い回すので、変更しないこと）
+    引数 path: 元画像のパス
+    引数 params: 加工の引数
+    引数 build: 元画像のパスを受け取って加工済み画像を返す関数
+    """
+    key = (build.__name__, path, params)
+    with _loaded_lock:
+        future = _loaded.get(key)
+        owner = future is None
+        if owner:
+            future = _loaded[key] = Future()
+    if owner:
+        try:
+            future.set_result(_load_from_disk(path, params, build))
+        except BaseException as e:
+            with _loaded_lock:
+                del _loaded[key] # 失敗したものは覚えず、次に呼ばれたときに読み直す
+            future.set_exception(e)
+    return future.result()
+
+
+def _load_from_disk(path:str, params:tuple, build) -> pygame.Surface:
+    """
+    加工済み画像をディスクのキャッシュから読み込む（なければ作って保存する）
+    キャッシュは元画像の内容のハッシュと加工の引数で区別する
+    引数 path: 元画像のパス
+    引数 params: 加工の引数（キャッシュのキーに使う）
+    引数 build: 元画像のパスを受け取って加工済み画像を返す関数
+    """
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read())
+    digest.update(repr((PIPELINE_VERSION, build.__name__, params)).encode())
+    cache_path = os.path.join(CACHE_DIR, digest.hexdigest() + ".png")
+
+    if os.path.exists(cache_path):
+        try:
+            return to_alpha(pygame.image.load(cache_path))
+        except pygame.error:
+            pass # 壊れたキャッシュは作り直す
+
+    image = build(path, *params)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        pygame.image.save(image, cache_path)
+    except (OSError, pygame.error):
+        pass # 保存できなくても加工済み画像はそのまま使える
+    return image
+
+
+def _build_keyed(path:str, size:tuple, threshold:int) -> pygame.Surface:
+    """
+    縮小してから左上の色を背景色として透過する
+    """
+    raw_image = pygame.image.load(path)
+    if pygame.display.get_surface() is not None:
+        raw_image = raw_image.convert()
+    image = to_alpha(pygame.transform.scale(raw_image, size))
+    strip_near_color(image, image.get_at((0, 0)), threshold)
+    return image
+
+
+def _build_cutout(path:str, size:tuple, threshold:int) -> pygame.Surface:
+    """
+    白っぽい背景を透過し、残った部分を切り抜いてなめらかに拡大縮小する
+    """
+    image = to_alpha(pygame.image.load(path))
+    strip_bright(image, threshold)
+    rect = image.get_bounding_rect()
+    if rect.width > 0 and rect.height > 0:
+        image = image.subsurface(rect)
+    return pygame.transform.smoothscale(image, size)
+
+
+def load_keyed_image(path:str, size:tuple, threshold:int) -> pygame.Surface:
+    """
+    画像を size に縮小し、左上のピクセルに近い色（背景）を透過した画像を返す
+    引数 path: 画像のパス
+    引数 size: 縮小後の大きさ (幅, 高さ)
+    引数 threshold: 背景色とのRGBの差の合計がこれ未満なら透過する
+    """
+    return load_cached(path, (tuple(size), threshold), _build_keyed)
+
+
+def load_cutout_image(path:str, size:tuple, threshold:int) -> pygame.Surface:
+    """
+    白っぽい背景を透過して切り抜き、size に拡大縮小した画像を返す
+    引数 path: 画像のパス
+    引数 size: 拡大縮小後の大きさ (幅, 高さ)
+    引数 threshold: R,G,B がすべてこれより大きいピクセルを透過する
+    """
+    return load_cached(path, (tuple(size), threshold), _build_cutout)
+
+
+def preload_in_background(loaders:list) -> threading.Thread:
+    """
+    画像の読み込みを別スレッドで先に済ませておく（結果は load_cached のメモリ上のキャッシュに入る）
+    読み込みに失敗したものは無視する（使うときにもう一度読み込んで、そこでエラーを扱う）
+    引数 loaders: 引数なしで呼ぶ読み込み関数のリスト
+    戻り値: 読み込み中のスレッド（終了を待つ必要はない）
+    """
+    def run() -> None:
+        for loader in loaders:
+            try:
+                loader()
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=run, name="asset-preload", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,157 @@
+"""
+弾・敵の画像をまとめた1枚の画像（テクスチャアトラス）と、それを使ってグループごとに1回の blits で描く描画レイヤー
+画像は最初に描くときに登録して詰め直し、画面のピクセル形式に変換して透明色を RLE で圧縮しておく
+（描画は「アトラス・描く位置・アトラスの中の範囲」の組を並べて Surface.blits に1回渡すだけになる）
+
+    atlas = SpriteAtlas()
+    layers = [AtlasLayer(atlas, enemies), AtlasLayer(atlas, bullets), SpriteLayer(player_group)]
+    for layer in layers:
+        layer.draw(screen)
+"""
+import pygame
+
+# アトラスの幅(px)（弾と敵の画像が数十種類なので1段〜数段に収まる）
+ATLAS_WIDTH = 256
+
+# アトラスの透明部分の色（弾・敵の画像に使われていない色にする）
+ATLAS_COLORKEY = (255, 0, 255)
+
+# 画像どうしの間に空ける隙間(px)
+ATLAS_PADDING = 1
+
+
+class SpriteAtlas:
+    """
+    弾・敵の画像を1枚にまとめたテクスチャアトラス
+    画像（Surface）ごとにアトラスの中の範囲を覚えておき、知らない画像が来たら全体を詰め直す
+    （色数が決まっている弾・敵の画像用。ピクセルごとの透明度を持つ画像は入れられない）
+    """
+    def __init__(self, width:int=ATLAS_WIDTH) -> None:
+        """
+        引数 width: アトラスの幅(px)
+        """
+        self.width = width
+        self.images = []    # 登録した画像（登録順）
+        self.rects = {}     # {画像: アトラスの中の範囲}
+        self.surface = None # アトラスの画像（まだ何も登録していなければ None）
+
+    def add(self, images) -> None:
+        """
+        画像を登録してアトラスを作り直す（登録済みの画像は無視する）
+        引数 images: 登録する画像（Surface）の並び
+        """
+        new = []
+        for image in images:
+            if image in self.rects or image in new:
+                continue
+            if image.get_flags() & pygame.SRCALPHA:
+                raise ValueError("ピクセルごとの透明度を持つ画像はアトラスに入れられません")
+            new.append(image)
+        if new:
+            self.images += new
+            self._build()
+
+    def area(self, image:pygame.Surface) -> pygame.Rect:
+        """
+        画像のアトラスの中の範囲を返す（登録していなければ登録する）
+        引数 image: 画像
+        """
+        if image not in self.rects:
+            self.add((image,))
+        return self.rects[image]
+
+    def _build(self) -> None:
+        """
+        登録した画像を背の高い順に棚詰めして、アトラスの画像を作り直す
+        """
+        rects = {}
+        x = y = shelf = 0
+        for image in sorted(self.images, key=lambda im: -im.get_height()):
+            w, h = image.get_size()
+            if x and x + w > self.width: # この段に入らなければ次の段へ
+                x, y = 0, y + shelf + ATLAS_PADDING
+                shelf = 0
+            rects[image] = pygame.Rect(x, y, w, h)
+            x += w + ATLAS_PADDING
+            shelf = max(shelf, h)
+
+        sheet = pygame.Surface((max(self.width, max(r.right for r in rects.values())), y + shelf))
+        sheet.fill(ATLAS_COLORKEY)
+        for image, rect in rects.items():
+            # 透明色を持つ画像は、透明な部分がアトラスの透明色のまま残る
+            sheet.blit(image, rect)
+        if pygame.display.get_surface() is not None:
+            sheet = sheet.convert() # 画面と同じピクセル形式にして、描くたびの変換をなくす
+        sheet.set_colorkey(ATLAS_COLORKEY, pygame.RLEACCEL)
+        self.surface = sheet
+        self.rects = rects
+
+
+class AtlasLayer:
+    """
+    スプライトのグループを、アトラスから1回の blits でまとめて描く描画レイヤー
+    """
+    def __init__(self, atlas:SpriteAtlas, group:pygame.sprite.AbstractGroup) -> None:
+        """
+        引数 atlas: 画像を取り出すアトラス
+        引数 group: 描くスプライトのグループ（画像はどれもアトラスに入れられるもの）
+        """
+        self.atlas = atlas
+        self.group = group
+        self.drawn = [] # 前回 draw(track=True) で描いた矩形（clear() で消す）
+
+    def draw(self, surface:pygame.Surface, track:bool=False) -> list:
+        """
+        グループのスプライトを描く
+        引数 surface: 描画先
+        引数 track: 描いた範囲を覚えて返すか（差分描画用）
+        戻り値: track=True なら前回と今回描いた矩形のリスト
+        """
+        atlas = self.atlas
+        sprites = self.group.sprites()
+        try:
+            sheet, areas = atlas.surface, atlas.rects
+            seq = [(sheet, sprite.rect, areas[sprite.image]) for sprite in sprites]
+        except KeyError:
+            # 初めて見る画像があればアトラスを作り直す（弾の種類や色が増えたときだけ）
+            atlas.add(sprite.image for sprite in sprites)
+            sheet, areas = atlas.surface, atlas.rects
+            seq = [(sheet, sprite.rect, areas[sprite.image]) for sprite in sprites]
+        if not track:
+            surface.blits(seq, False)
+            return []
+        rects = surface.blits(seq)
+        dirty = self.drawn + rects
+        self.drawn = rects
+        return dirty
+
+    def clear(self, surface:pygame.Surface, background:pygame.Surface) -> None:
+        """
+        前回 draw(track=True) で描いたスプライトを背景で消す
+        引数 surface: 描画先
+        引数 background: 背景画像
+        """
+        if self.drawn:
+            surface.blits([(background, rect, rect) for rect in self.drawn], False)
+
+
+class SpriteLayer(AtlasLayer):
+    """
+    スプライトのグループを、それぞれの画像のまま1回の blits でまとめて描く描画レイヤー
+    （自機・ボスなど、数が少なくアトラスに入れない画像用）
+    """
+    def __init__(self, group:pygame.sprite.AbstractGroup) -> None:
+        """
+        引数 group: 描くスプライトのグループ
+        """
+        super().__init__(None, group)
+
+    def draw(self, surface:pygame.Surface, track:bool=False) -> list:
+        seq = [(sprite.image, sprite.rect) for sprite in self.group.sprites()]
+        if not track:
+            surface.blits(seq, False)
+            return []
+        rects = surface.blits(seq)
+        dirty = self.drawn + rects
+        self.drawn = rects
+        return dirty
@@ -0,0 +1,152 @@
+"""
+シナリオベンチマーク
+名前付きのシナリオごとに shoot.py をヘッドレス（描画あり・FPS上限なし）で実行し、
+フレーム時間の p50/p95/p99、処理段階ごとの時間、弾の数、メモリ確保数をJSONにまとめる
+--baseline で以前の結果と比べ、遅くなったシナリオがあれば終了コード 1 を返す
+
+使い方:
+    python bench.py --out bench_results.json
+    python bench.py --baseline bench_results.json --tolerance 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+import pygame
+
+from replay import KEY_BITS, Recorder
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FPS = 60
+
+# キャラ番号（shoot.py の CHAR_LIST の添字）
+CHAR_SHOTGUN = 2
+CHAR_REIMU = 3
+CHAR_MELEE = 6
+
+# シナリオ定義
+# input: "fire" は Z 押しっぱなし、"fire_sweep" は Z を押したまま左右に往復する
+SCENARIOS = {
+    "boss5_shotgun": {
+        "desc": "ボスLv5 を PlayerShotgun で 3000 フレーム",
+        "char": CHAR_SHOTGUN, "frames": 3000, "input": "fire_sweep",
+        "options": ["--boss-level", "5"],
+    },
+    "melee_cancel_barrage": {
+        "desc": "PlayerMelee が濃いボス弾幕を斬り消し続ける",
+        "char": CHAR_MELEE, "frames": 3000, "input": "fire",
+        "options": ["--boss-level", "10"],
+    },
+    "reimu_max_spawn": {
+        "desc": "ザコ敵の出現密度を最大にして PlayerReimu の誘導弾で撃つ",
+        "char": CHAR_REIMU, "frames": 3000, "input": "fire_sweep",
+        "options": ["--spawn-rate", "1.0"],
+    },
+}
+
+
+def make_input(kind:str, frames:int) -> bytearray:
+    """
+    シナリオの入力（1フレーム1バイトのキーマスク列）を作る
+    引数 kind: 入力の種類
+    引数 frames: フレーム数
+    """
+    fire = KEY_BITS[pygame.K_z]
+    masks = bytearray()
+    for f in range(frames):
+        mask = fire
+        if kind == "fire_sweep":
+            # 1秒ごとに左右を入れ替える
+            mask |= KEY_BITS[pygame.K_LEFT] if (f // FPS) % 2 == 0 else KEY_BITS[pygame.K_RIGHT]
+        masks.append(mask)
+    return masks
+
+
+def run_scenario(name:str, scenario:dict, seed:int, workdir:str) -> dict:
+    """
+    シナリオを1つ実行して集計結果を返す
+    引数 name: シナリオ名
+    引数 scenario: シナリオ定義
+    引数 seed: 乱数シード
+    引数 workdir: 一時ファイルの置き場所
+    """
+    replay_path = os.path.join(workdir, f"{name}.rep")
+    stats_path = os.path.join(workdir, f"{name}.json")
+    recorder = Recorder(replay_path, seed, scenario["char"])
+    recorder.masks = make_input(scenario["input"], scenario["frames"])
+    recorder.save()
+
+    command = [sys.executable, os.path.join(HERE, "shoot.py"), "--headless", "--render", "--invincible",
+               "--replay", replay_path, "--stats-out", stats_path] + scenario["options"]
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    with open(stats_path, encoding="utf-8") as f:
+        summary = json.load(f)["summary"]
+    summary["desc"] = scenario["desc"]
+    return summary
+
+
+def compare(results:dict, baseline:dict, tolerance:float) -> list:
+    """
+    基準の結果と比べて遅くなったシナリオを返す
+    引数 results: 今回の結果
+    引数 baseline: 基準の結果
+    引数 tolerance: 許容する悪化の割合（0.1 なら 10%）
+    戻り値: [(シナリオ名, 指標, 基準値, 今回値), ...]
+    """
+    slower = []
+    for name, summary in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        for key in ("p50", "p95"):
+            now = summary["frame_ms"][key]
+            before = base["frame_ms"][key]
+            if now > before * (1 + tolerance):
+                slower.append((name, key, before, now))
+    return slower
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="シナリオベンチマーク")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), help="実行するシナリオ（省略時は全部）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", metavar="FILE", help="結果のJSONの保存先")
+    parser.add_argument("--baseline", metavar="FILE", help="比較する基準の結果JSON")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="許容する悪化の割合")
+    args = parser.parse_args()
+
+    names = args.scenario or list(SCENARIOS)
+    results = {"python": platform.python_version(), "platform": platform.platform(), "seed": args.seed, "scenarios": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            summary = run_scenario(name, SCENARIOS[name], args.seed, workdir)
+            results["scenarios"][name] = summary
+            frame = summary["frame_ms"]
+            bullets = summary["counts"].get("enemy_bullets", {})
+            print(f"{name:<22} p50={frame['p50']:6.2f}ms p95={frame['p95']:6.2f}ms p99={frame['p99']:6.2f}ms "
+                  f"敵弾(平均/最大)={bullets.get('mean', 0):.0f}/{bullets.get('max', 0)} "
+                  f"確保ブロック増加={summary['alloc_blocks']['growth']}")
+            for phase, values in summary["phases_ms"].items():
+                print(f"    {phase:<10} p50={values['p50']:6.3f}ms p95={values['p95']:6.3f}ms p99={values['p99']:6.3f}ms")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.tolerance)
+        for name, key, before, now in slower:
+            print(f"遅くなりました: {name} {key} {before:.2f}ms -> {now:.2f}ms")
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+衝突判定ベンチマーク
+pygame の総当たり判定 (groupcollide / spritecollide) と空間ハッシュ版、
+Sprite の敵弾と配列の敵弾 (BulletArray) の判定を物体数を増やしながら比較し、
+結果が一致することと速度差を表示する
+最後に、空間ハッシュが総当たりより速くなる境目（判定する組の数）を表示する
+（SpatialHash はこれより少ない組では総当たりを使う。spatial_hash.BRUTE_FORCE_PAIRS）
+
+使い方: python bench_collision.py [--sizes 50 200 1000] [--repeat 20]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import pygame
+
+from bullet_store import BulletArray
+from spatial_hash import BRUTE_FORCE_PAIRS, SpatialHash
+
+SCREEN_WIDTH = 600
+SCREEN_HEIGHT = 800
+
+
+def make_group(count:int, size:tuple, rng:random.Random) -> pygame.sprite.Group:
+    """
+    ランダムな位置にスプライトを並べたグループを作る
+    引数 count: スプライトの数
+    引数 size: スプライトの大きさ (幅, 高さ)
+    引数 rng: 乱数生成器
+    """
+    group = pygame.sprite.Group()
+    for _ in range(count):
+        sprite = pygame.sprite.Sprite()
+        sprite.rect = pygame.Rect(rng.randrange(-20, SCREEN_WIDTH), rng.randrange(-60, SCREEN_HEIGHT), *size)
+        group.add(sprite)
+    return group
+
+
+def copy_group(group:pygame.sprite.Group) -> tuple:
+    """
+    同じ位置のスプライトを持つグループを複製する（消去ありの判定を両方で試すため）
+    引数 group: 複製元
+    戻り値: (複製したグループ, 元スプライト -> 複製スプライト の辞書)
+    """
+    copied = pygame.sprite.Group()
+    mapping = {}
+    for sprite in group:
+        twin = pygame.sprite.Sprite()
+        twin.rect = sprite.rect.copy()
+        copied.add(twin)
+        mapping[sprite] = twin
+    return copied, mapping
+
+
+def timeit(func, repeat:int) -> float:
+    """
+    関数を repeat 回実行した平均時間(ms)を返す
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_sprites(n:int, repeat:int, rng:random.Random) -> tuple:
+    """
+    敵 n/4 体 × 自機弾 n 発の groupcollide を比較する
+    戻り値: (判定する組の数, 総当たり[ms], 空間ハッシュのみ[ms], SpatialHash（組が少なければ総当たり）[ms])
+    """
+    enemies = make_group(max(n // 4, 1), (30, 30), rng)
+    bullets = make_group(n, (10, 10), rng)
+
+    # 結果の一致確認（弾を消す設定で、消した後の状態まで比較する）
+    enemies_b, map_e = copy_group(enemies)
+    bullets_b, map_b = copy_group(bullets)
+    expected = pygame.sprite.groupcollide(enemies, bullets, False, True)
+    grid = SpatialHash(brute_force_pairs=0)
+    grid.rebuild(bullets_b)
+    actual = grid.groupcollide(enemies_b, bullets_b, False, True)
+    expected = {map_e[e]: [map_b[b] for b in hit] for e, hit in expected.items()}
+    assert expected == actual, "空間ハッシュの判定結果が総当たりと一致しません"
+
+    # 時間計測（消去なし）
+    brute = timeit(lambda: pygame.sprite.groupcollide(enemies, bullets, False, False), repeat)
+
+    def hashed(grid):
+        grid.rebuild(bullets)
+        grid.groupcollide(enemies, bullets, False, False)
+    auto = SpatialHash()
+    return len(enemies) * len(bullets), brute, timeit(lambda: hashed(grid), repeat), timeit(lambda: hashed(auto), repeat)
+
+
+def bench_array(n:int, repeat:int, rng:random.Random) -> tuple:
+    """
+    敵弾 n 発に対する自機 1 回＋近接弾 3 個の判定を、
+    Sprite の敵弾 (spritecollide) と配列の敵弾 (BulletArray) で比較する
+    戻り値: (spritecollide[ms], BulletArray[ms])
+    """
+    bullets = make_group(n, (8, 8), rng)
+    store = BulletArray(pygame.Surface((8, 8)), (SCREEN_WIDTH, SCREEN_HEIGHT))
+    centers = [b.rect.center for b in bullets]
+    store.add_many(np.array([c[0] for c in centers]), np.array([c[1] for c in centers]), np.zeros(n), np.zeros(n))
+    player = pygame.sprite.Sprite()
+    player.rect = pygame.Rect(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 80, 30, 30)
+    rects = [player.rect] + [pygame.Rect(rng.randrange(SCREEN_WIDTH), rng.randrange(SCREEN_HEIGHT), 20, 20) for _ in range(3)]
+
+    # 結果の一致確認
+    for r in rects:
+        probe = pygame.sprite.Sprite()
+        probe.rect = r
+        expected = bool(pygame.sprite.spritecollide(probe, bullets, False))
+        assert expected == store.collide_rect(r), "配列の判定結果が spritecollide と一致しません"
+
+    def sprites():
+        for r in rects:
+            player.rect = r
+            pygame.sprite.spritecollide(player, bullets, False)
+
+    def array():
+        for r in rects:
+            store.collide_rect(r)
+    return timeit(sprites, repeat), timeit(array, repeat)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="衝突判定ベンチマーク")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500, 1000, 2000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"{'数':>6} {'組の数':>8} | {'groupcollide[ms]':>16} {'空間ハッシュ[ms]':>16} {'倍率':>6} {'自動[ms]':>9} | {'敵弾数':>6} {'spritecollide[ms]':>17} {'BulletArray[ms]':>15} {'倍率':>6}")
+    crossover = None # 空間ハッシュが総当たりより速くなった最初の組の数
+    for n in args.sizes:
+        pairs, brute, hashed, auto = bench_sprites(n, args.repeat, rng)
+        sprites, array = bench_array(n * 5, args.repeat, rng)
+        if crossover is None and hashed < brute:
+            crossover = pairs
+        print(f"{n:>6} {pairs:>8} | {brute:>16.3f} {hashed:>16.3f} {brute / hashed:>6.1f} {auto:>9.3f} | {n * 5:>6} {sprites:>17.3f} {array:>15.3f} {sprites / array:>6.1f}")
+    if crossover is None:
+        print(f"損益分岐点: 測った範囲では空間ハッシュが総当たりより速くならなかった（総当たりの上限 BRUTE_FORCE_PAIRS = {BRUTE_FORCE_PAIRS} 組）")
+    else:
+        print(f"損益分岐点: 空間ハッシュは {crossover} 組から総当たりより速い（総当たりの上限 BRUTE_FORCE_PAIRS = {BRUTE_FORCE_PAIRS} 組）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+import math
+
+import numpy as np
+import pygame
+
+from hitbox import CircleHitbox, MaskHitbox, circle_mask, hitbox_of, mask_overlap
+
+# フラグ定義（ビット）
+FLAG_ALIVE = 1  # 生存中。消された弾は次の update() で詰め直される
+
+
+class BulletArray:
+    """
+    敵弾をNumPyの構造体配列(SoA)でまとめて管理するクラス
+    弾1発ごとにSpriteを作らず、位置・速度・寿命・フラグを配列で持ち、
+    移動・寿命管理・画面外削除・詰め直しをフレームごとに一括で行う
+    enemy_bullets(Group) の置き換えとして update / draw / empty / len が使える
+    """
+    def __init__(self, image:pygame.Surface, bounds:tuple, capacity:int=1024, margin:int=50, hit_radius:float | None=None) -> None:
+        """
+        弾ストアの設定
+        引数 image: 全弾で共有する弾画像
+        引数 bounds: 画面サイズ (幅, 高さ)
+        引数 capacity: 初期の確保数（足りなくなったら倍に拡張）
+        引数 margin: 画面外削除の余白(px)
+        引数 hit_radius: collide_sprite() で使う弾の当たり判定の円の半径（省略時は画像の半分）
+        """
+        self.image = image
+        self.size = image.get_width()
+        self.half = self.size // 2
+        self.width, self.height = bounds
+        self.margin = margin
+        self.hit_radius = self.half if hit_radius is None else hit_radius
+        self.count = 0
+        self.moved = 0  # 前回の update() で動かした弾の数（それ以降に追加した弾はまだ出した位置にいる）
+        self.drawn = [] # 前回 draw(track=True) で描いた矩形（clear() で消す）
+        self._allocate(capacity)
+
+    def _allocate(self, capacity:int) -> None:
+        """
+        配列を確保する（既存の弾は先頭から引き継ぐ）
+        引数 capacity: 新しい確保数
+        """
+        n = self.count
+        old = getattr(self, "x", None)
+        x = np.zeros(capacity, dtype=np.float32)
+        y = np.zeros(capacity, dtype=np.float32)
+        vx = np.zeros(capacity, dtype=np.float32)
+        vy = np.zeros(capacity, dtype=np.float32)
+        life = np.zeros(capacity, dtype=np.int32)
+        flags = np.zeros(capacity, dtype=np.uint8)
+        if old is not None and n:
+            x[:n] = self.x[:n]
+            y[:n] = self.y[:n]
+            vx[:n] = self.vx[:n]
+            vy[:n] = self.vy[:n]
+            life[:n] = self.life[:n]
+            flags[:n] = self.flags[:n]
+        self.x, self.y, self.vx, self.vy, self.life, self.flags = x, y, vx, vy, life, flags
+        self.capacity = capacity
+
+    def add(self, x:float, y:float, vx:float, vy:float, life:int=0) -> None:
+        """
+        弾を1発追加する
+        引数 x,y: 弾の中心座標
+        引数 vx,vy: 弾の速度
+        引数 life: 弾の寿命（フレーム数）。0なら無限（画面外まで）
+        """
+        if self.count >= self.capacity:
+            self._allocate(self.capacity * 2)
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.life[i] = life
+        self.flags[i] = FLAG_ALIVE
+        self.count += 1
+
+    def add_many(self, xs, ys, vxs, vys, life:int=0) -> None:
+        """
+        弾をまとめて追加する
+        引数 xs,ys: 弾の中心座標（配列またはスカラー）
+        引数 vxs,vys: 弾の速度（配列）
+        引数 life: 弾の寿命（フレーム数）。0なら無限（画面外まで）
+        """
+        vxs = np.asarray(vxs, dtype=np.float32)
+        k = vxs.shape[0]
+        if k == 0:
+            return
+        need = self.count + k
+        if need > self.capacity:
+            capacity = self.capacity
+            while capacity < need:
+                capacity *= 2
+            self._allocate(capacity)
+        s = slice(self.count, need)
+        self.x[s] = xs
+        self.y[s] = ys
+        self.vx[s] = vxs
+        self.vy[s] = vys
+        self.life[s] = life
+        self.flags[s] = FLAG_ALIVE
+        self.count = need
+
+    def update(self) -> None:
+        """
+        全弾の移動処理と寿命管理・画面外削除を一括で行い、生きている弾を前に詰める
+        """
+        n = self.count
+        if n == 0:
+            self.moved = 0
+            return
+        x = self.x[:n]
+        y = self.y[:n]
+        x += self.vx[:n]
+        y += self.vy[:n]
+
+        # 寿命がある弾の処理（0は無限）
+        life = self.life[:n]
+        limited = life > 0
+        life[limited] -= 1
+        alive = (self.flags[:n] & FLAG_ALIVE) != 0
+        alive &= ~(limited & (life <= 0))
+
+        # 画面外に出たら削除
+        m = self.margin
+        left = x - self.half
+        top = y - self.half
+        alive &= top + self.size >= -m
+        alive &= top <= self.height + m
+        alive &= left >= -m
+        alive &= left + self.size <= self.width + m
+        self._compact(alive)
+        self.moved = self.count
+
+    def _compact(self, alive:np.ndarray) -> None:
+        """
+        生きている弾だけを配列の先頭に詰め直す
+        引数 alive: 先頭 count 件に対する生存マスク
+        """
+        n = self.count
+        keep = int(np.count_nonzero(alive))
+        if keep == n:
+            return
+        for arr in (self.x, self.y, self.vx, self.vy, self.life, self.flags):
+            arr[:keep] = arr[:n][alive]
+        self.count = keep
+
+    def _hit_mask(self, rect:pygame.Rect) -> np.ndarray:
+        """
+        矩形と重なっている生存弾のマスクを返す（pygame.Rect.colliderect と同じ判定）
+        引数 rect: 判定する矩形
+        """
+        n = self.count
+        left = np.rint(self.x[:n]) - self.half
+        top = np.rint(self.y[:n]) - self.half
+        mask = (left < rect.right) & (left + self.size > rect.left)
+        mask &= (top < rect.bottom) & (top + self.size > rect.top)
+        mask &= (self.flags[:n] & FLAG_ALIVE) != 0
+        return mask
+
+    def collide_rect(self, rect:pygame.Rect) -> bool:
+        """
+        矩形に当たっている弾があるかどうか（自機の被弾判定用）
+        引数 rect: 判定する矩形
+        """
+        if self.count == 0:
+            return False
+        return bool(self._hit_mask(rect).any())
+
+    def collide_sprite(self, sprite:pygame.sprite.Sprite) -> bool:
+        """
+        スプライトの判定の形（hitbox.hitbox_of）に当たっている弾があるかどうか（自機の被弾判定用）
+        弾は半径 hit_radius の円として扱い、矩形で候補を絞ってから候補だけを詳しく判定する
+        引数 sprite: 判定するスプライト
+        """
+        if self.count == 0:
+            return False
+        rect = sprite.rect
+        index = np.flatnonzero(self._hit_mask(rect))
+        if index.size == 0:
+            return False
+        x = np.rint(self.x[index])
+        y = np.rint(self.y[index])
+        r = self.hit_radius
+        hitbox = hitbox_of(sprite)
+        if isinstance(hitbox, CircleHitbox):
+            dx = x - rect.centerx
+            dy = y - rect.centery
+            d = hitbox.radius + r
+            return bool((dx * dx + dy * dy <= d * d).any())
+        if isinstance(hitbox, MaskHitbox):
+            bullet_mask = circle_mask(r)
+            ri = math.ceil(r)
+            for bx, by in zip(x.astype(np.int32).tolist(), y.astype(np.int32).tolist()):
+                if mask_overlap(hitbox.mask, rect, bullet_mask, bx - ri, by - ri):
+                    return True
+            return False
+        # 矩形：矩形内で円の中心に最も近い点までの距離で判定する
+        dx = x - np.clip(x, rect.left, rect.right - 1)
+        dy = y - np.clip(y, rect.top, rect.bottom - 1)
+        return bool((dx * dx + dy * dy <= r * r).any())
+
+    def kill_in_rect(self, rect:pygame.Rect) -> int:
+        """
+        矩形に当たっている弾を消す
+        消した弾は次の update() で詰め直される
+        引数 rect: 判定する矩形
+        戻り値: 消した弾の数
+        """
+        return self.kill_in_rects([rect])
+
+    def kill_in_rects(self, rects:list) -> int:
+        """
+        いずれかの矩形に当たっている弾をまとめて消す（近接攻撃・画面全体の弾消し用）
+        引数 rects: 判定する矩形のリスト
+        戻り値: 消した弾の数
+        """
+        return len(self.pop_in_rects(rects)[0])
+
+    def pop_in_rects(self, rects:list) -> tuple:
+        """
+        いずれかの矩形に当たっている弾をまとめて消し、消した弾の位置を返す（弾消しのエフェクト用）
+        全矩形を囲む矩形で候補の弾を絞ってから、候補と全矩形の組を一度に判定する
+        （矩形ごとに全弾を調べ直さないので、矩形が多くても弾の位置の計算は1回で済む）
+        消した弾は次の update() で詰め直される
+        引数 rects: 判定する矩形のリスト
+        戻り値: 消した弾の中心の (x座標の配列, y座標の配列)
+        """
+        if self.count == 0 or not rects:
+            return self.x[:0], self.y[:0]
+        index = np.flatnonzero(self._hit_mask(rects[0].unionall(rects[1:])))
+        if index.size and len(rects) > 1:
+            bounds = np.array([(r.left, r.top, r.right, r.bottom) for r in rects])
+            left = (np.rint(self.x[index]) - self.half)[:, None]
+            top = (np.rint(self.y[index]) - self.half)[:, None]
+            hit = (left < bounds[:, 2]) & (left + self.size > bounds[:, 0])
+            hit &= (top < bounds[:, 3]) & (top + self.size > bounds[:, 1])
+            index = index[hit.any(axis=1)]
+        if index.size:
+            self.flags[index] &= ~np.uint8(FLAG_ALIVE)
+        return self.x[index], self.y[index]
+
+    def draw(self, surface:pygame.Surface, track:bool=False, alpha:float=1.0, atlas=None) -> list:
+        """
+        生きている弾をまとめて描画する
+        引数 surface: 描画先
+        引数 track: 描いた範囲を覚えて返すか（差分描画用）
+        引数 alpha: 1フレーム前の位置(0)から今の位置(1)までのどこに描くか（弾は等速なので速度から戻して求める）
+        引数 atlas: 指定すると弾画像をこのアトラス (atlas.SpriteAtlas) から切り出して描く
+        戻り値: track=True なら前回と今回描いた矩形のリスト
+        """
+        n = self.count
+        if n == 0:
+            if not track:
+                return [] # 前回描いた範囲の記録（self.drawn）は track=True のときだけ変える
+            dirty = self.drawn
+            self.drawn = []
+            return dirty
+        alive = (self.flags[:n] & FLAG_ALIVE) != 0
+        if alpha < 1.0:
+            # 前回の update() の後に出た弾はまだ動いていないので戻さない
+            k = self.moved
+            x = self.x[:n].copy()
+            y = self.y[:n].copy()
+            x[:k] -= self.vx[:k] * np.float32(1.0 - alpha)
+            y[:k] -= self.vy[:k] * np.float32(1.0 - alpha)
+            x = x[alive]
+            y = y[alive]
+        else:
+            x = self.x[:n][alive]
+            y = self.y[:n][alive]
+        left = (np.rint(x) - self.half).astype(np.int32).tolist()
+        top = (np.rint(y) - self.half).astype(np.int32).tolist()
+        if atlas is not None:
+            area = atlas.area(self.image)
+            seq = [(atlas.surface, pos, area) for pos in zip(left, top)]
+        else:
+            image = self.image
+            seq = [(image, pos) for pos in zip(left, top)]
+        if not track:
+            surface.blits(seq, False)
+            return []
+        rects = surface.blits(seq)
+        dirty = self.drawn + rects
+        self.drawn = rects
+        return dirty
+
+    def clear(self, surface:pygame.Surface, background:pygame.Surface) -> None:
+        """
+        前回 draw(track=True) で描いた弾を背景で消す
+        引数 surface: 描画先
+        引数 background: 背景画像
+        """
+        if self.drawn:
+            surface.blits([(background, rect, rect) for rect in self.drawn], False)
+
+    def empty(self) -> None:
+        """
+        全弾を削除する
+        """
+        self.count = 0
+        self.moved = 0
+
+    def __len__(self) -> int:
+        """
+        生存している弾の数
+        """
+        n = self.count
+        if n == 0:
+            return 0
+        return int(np.count_nonzero(self.flags[:n] & FLAG_ALIVE))
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
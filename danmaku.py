@@ -0,0 +1,146 @@
+import math
+
+import numpy as np
+
+# 角度の表の細かさ（1度あたりの分割数）
+STEPS_PER_DEGREE = 10
+TABLE_SIZE = 360 * STEPS_PER_DEGREE
+
+# cos/sin の表（math.cos/sin で作るので、整数角度では毎回計算したときと同じ値になる）
+COS_TABLE = np.array([math.cos(math.radians(i / STEPS_PER_DEGREE)) for i in range(TABLE_SIZE)])
+SIN_TABLE = np.array([math.sin(math.radians(i / STEPS_PER_DEGREE)) for i in range(TABLE_SIZE)])
+
+# 1回の弾の数の上限（高レベルでも画面が埋まりきらないように）
+MAX_VOLLEY = 96
+
+
+def velocities(angles:np.ndarray, speed:float) -> tuple:
+    """
+    角度の配列から速度ベクトルの配列を表引きでまとめて求める
+    引数 angles: 角度（度、0が右向き、時計回り）の配列
+    引数 speed: 弾速
+    戻り値: (vx の配列, vy の配列)
+    """
+    idx = np.rint(angles * STEPS_PER_DEGREE).astype(np.int64) % TABLE_SIZE
+    return COS_TABLE[idx] * speed, SIN_TABLE[idx] * speed
+
+
+class Pattern:
+    """
+    弾幕パターンの親クラス
+    interval フレームごとに angles() が返す向きへ speed の弾を撃つ
+    """
+    def __init__(self, interval:int, speed:float) -> None:
+        """
+        引数 interval: 発射間隔（フレーム数）
+        引数 speed: 弾速
+        """
+        self.interval = interval
+        self.speed = speed
+
+    def angles(self, x:float, y:float, target:tuple | None) -> np.ndarray:
+        """
+        1回分の弾の角度（度）の配列を返す（子クラスで実装する）
+        引数 x,y: 発射位置
+        引数 target: 狙う位置（自機の中心）。いなければ None
+        """
+        raise NotImplementedError
+
+
+class Ring(Pattern):
+    """
+    全方位に等間隔で撃つ円形弾
+    """
+    def __init__(self, interval:int, speed:float, count:int, offset:float=0.0) -> None:
+        """
+        引数 count: 1回の弾の数
+        引数 offset: 最初の弾の角度（度）
+        """
+        super().__init__(interval, speed)
+        self.base = np.arange(count) * (360 / count) + offset
+        self.turn = 0.0
+
+    def angles(self, x:float, y:float, target:tuple | None) -> np.ndarray:
+        # 毎回半分ずらして、弾の隙間が同じ場所に並ばないようにする
+        self.turn = 180 / len(self.base) - self.turn
+        return self.base + self.turn
+
+
+class Spiral(Pattern):
+    """
+    回転する多腕の渦巻き弾（spin が負なら逆回転）
+    """
+    def __init__(self, interval:int, speed:float, arms:int, spin:float) -> None:
+        """
+        引数 arms: 腕の数（1回の弾の数）
+        引数 spin: 1回ごとに回す角度（度）
+        """
+        super().__init__(interval, speed)
+        self.base = np.arange(arms) * (360 / arms)
+        self.spin = spin
+        self.angle = 0
+
+    def angles(self, x:float, y:float, target:tuple | None) -> np.ndarray:
+        self.angle += self.spin
+        return self.base + self.angle
+
+
+class AimedFan(Pattern):
+    """
+    自機を狙った扇形弾
+    """
+    def __init__(self, interval:int, speed:float, count:int, spread:float) -> None:
+        """
+        引数 count: 1回の弾の数
+        引数 spread: 両端の弾の間の角度（度）
+        """
+        super().__init__(interval, speed)
+        self.base = np.linspace(-spread / 2, spread / 2, count) if count > 1 else np.zeros(1)
+
+    def angles(self, x:float, y:float, target:tuple | None) -> np.ndarray:
+        if target is None:
+            aim = 90.0 # 自機がいなければ真下
+        else:
+            aim = math.degrees(math.atan2(target[1] - y, target[0] - x))
+        return self.base + aim
+
+
+def boss_patterns(level:int) -> list:
+    """
+    ボスのレベルに応じた弾幕パターンの組み合わせを返す（レベルが上がるほど種類と密度が増える）
+    レベル1は従来どおりの4方向の回転弾だけ
+    引数 level: ボスのレベル
+    """
+    patterns = [Spiral(5, 4, arms=min(4 + (level - 1) // 2 * 2, 16), spin=12)]
+    if level >= 2:
+        patterns.append(AimedFan(60, 5, count=min(3 + level // 2 * 2, 15), spread=min(20 + 5 * level, 90)))
+    if level >= 3:
+        patterns.append(Ring(90, 3, count=min(8 + 4 * level, 48)))
+    if level >= 4:
+        patterns.append(Spiral(8, 3, arms=min(level - 1, 8), spin=-7))
+    return patterns
+
+
+def fire(patterns:list, store, timer:int, x:float, y:float, target:tuple | None) -> int:
+    """
+    このフレームに撃つパターンの弾をまとめて弾ストアに追加する
+    引数 patterns: 弾幕パターンのリスト
+    引数 store: 追加先の弾ストア（BulletArray）
+    引数 timer: 攻撃開始からのフレーム数
+    引数 x,y: 発射位置
+    引数 target: 狙う位置（自機の中心）。いなければ None
+    戻り値: 追加した弾の数
+    """
+    vxs = []
+    vys = []
+    for pattern in patterns:
+        if timer % pattern.interval == 0:
+            vx, vy = velocities(pattern.angles(x, y, target), pattern.speed)
+            vxs.append(vx)
+            vys.append(vy)
+    if not vxs:
+        return 0
+    vx = np.concatenate(vxs)[:MAX_VOLLEY]
+    vy = np.concatenate(vys)[:MAX_VOLLEY]
+    store.add_many(x, y, vx, vy)
+    return len(vx)
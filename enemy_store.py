@@ -0,0 +1,131 @@
+import math
+
+import numpy as np
+
+# 蛇行の位相表の初期の長さ（フレーム数）。足りなくなったら伸ばす
+WAVE_TABLE_SIZE = 512
+
+# 蛇行の位相は毎フレーム 0.1 ずつ足していく（足し算の誤差まで1体ずつ計算したときと同じにするため、足しながら表を作る）
+WAVE_STEP = 0.1
+
+
+def _wave_table(size:int) -> np.ndarray:
+    """
+    出現からのフレーム数ごとの sin(位相) の表を作る
+    引数 size: 表の長さ
+    """
+    table = np.empty(size)
+    t = 0.0
+    for i in range(size):
+        t += WAVE_STEP
+        table[i] = math.sin(t)
+    return table
+
+
+def round_half_away(values:np.ndarray) -> np.ndarray:
+    """
+    0から遠い方へ四捨五入する（pygame.Rect に小数を足したときの丸め方と同じ）
+    """
+    return np.copysign(np.floor(np.abs(values) + 0.5), values)
+
+
+class EnemyBatch:
+    """
+    同じ種類のザコ敵をまとめて管理するクラス
+    位置・出現からのフレーム数・発射タイマーを配列で持ち、移動・蛇行・狙い撃ちを種類ごとに一括で行う
+    スプライト（衝突判定・描画用）は配列と同じ順番のリストで持ち、更新後に位置だけを書き戻す
+    """
+    wave_table = _wave_table(WAVE_TABLE_SIZE) # 全種類で共有する蛇行の位相表
+
+    def __init__(self, speed_y:int, wave:float=0.0, shoot_interval:int=0, shot_speed:float=0.0) -> None:
+        """
+        引数 speed_y: 1フレームに下へ進む距離(px)
+        引数 wave: 蛇行の振れ幅（1フレームに横へ動く最大の距離(px)）。0なら蛇行しない
+        引数 shoot_interval: 自機を狙い撃つ間隔（フレーム数）。0なら撃たない
+        引数 shot_speed: 狙い撃つ弾の速さ
+        """
+        self.speed_y = speed_y
+        self.wave = wave
+        self.shoot_interval = shoot_interval
+        self.shot_speed = shot_speed
+        self.sprites = []
+        self.x = np.zeros(0, dtype=np.int64)
+        self.y = np.zeros(0, dtype=np.int64)
+        self.age = np.zeros(0, dtype=np.int64)   # 出現からのフレーム数（蛇行の位相表の添字）
+        self.timer = np.zeros(0, dtype=np.int64) # 発射タイマー
+
+    def add(self, sprite) -> None:
+        """
+        敵を追加する（位置は sprite.rect から読む）
+        引数 sprite: 追加する敵のスプライト
+        """
+        self.sprites.append(sprite)
+        self.x = np.append(self.x, sprite.rect.x)
+        self.y = np.append(self.y, sprite.rect.y)
+        self.age = np.append(self.age, 0)
+        self.timer = np.append(self.timer, 0)
+
+    def _drop_dead(self) -> None:
+        """
+        衝突判定などで消されたスプライトを配列から取り除く
+        """
+        alive = [sprite.alive() for sprite in self.sprites]
+        if all(alive):
+            return
+        keep = np.array(alive, dtype=bool)
+        self.sprites = [sprite for sprite, a in zip(self.sprites, alive) if a]
+        self.x = self.x[keep]
+        self.y = self.y[keep]
+        self.age = self.age[keep]
+        self.timer = self.timer[keep]
+
+    def update(self, bullets, target:tuple | None, height:int) -> None:
+        """
+        全員をまとめて1フレーム分動かし、撃つ時期が来た敵はまとめて自機を狙い撃つ
+        引数 bullets: 敵弾の追加先（BulletArray）
+        引数 target: 狙う位置（自機の中心）。いなければ None
+        引数 height: 画面の高さ（下に出た敵は消す）
+        """
+        self._drop_dead()
+        if not self.sprites:
+            return
+        self.y += self.speed_y
+
+        if self.wave:
+            # 出現順に並んでいるので、一番古い敵は先頭にいる
+            if self.age[0] >= len(EnemyBatch.wave_table):
+                EnemyBatch.wave_table = _wave_table(len(EnemyBatch.wave_table) * 2)
+            self.x = round_half_away(self.x + self.wave_table[self.age] * self.wave).astype(np.int64)
+        self.age += 1
+
+        w, h = self.sprites[0].rect.size
+        if self.shoot_interval:
+            self.timer += 1
+            ready = np.flatnonzero(self.timer > self.shoot_interval)
+            if ready.size:
+                self.timer[ready] = 0
+                if target is not None:
+                    # 中心から自機への向きを全員分まとめて求める（rect.center と同じく大きさの半分を切り捨てで足す）
+                    cx = self.x[ready] + w // 2
+                    cy = self.y[ready] + h // 2
+                    angle = np.arctan2(target[1] - cy, target[0] - cx)
+                    bullets.add_many(cx, cy, np.cos(angle) * self.shot_speed, np.sin(angle) * self.shot_speed)
+
+        for sprite, pos in zip(self.sprites, zip(self.x.tolist(), self.y.tolist())):
+            sprite.rect.topleft = pos
+        # 画面の下に出た敵を消す（次のフレームで配列からも取り除く）
+        for i in np.flatnonzero(self.y > height).tolist():
+            self.sprites[i].kill()
+
+    def clear(self) -> None:
+        """
+        全員を取り除く（スプライトのグループからは呼び出し側で消す）
+        """
+        self.sprites = []
+        self.x = self.x[:0]
+        self.y = self.y[:0]
+        self.age = self.age[:0]
+        self.timer = self.timer[:0]
+
+    def __len__(self) -> int:
+        return len(self.sprites)
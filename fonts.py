@@ -0,0 +1,63 @@
+"""
+フォントの解決（システムフォントを探した結果をファイルにキャッシュする）
+pygame.font.SysFont は最初の呼び出しでシステムの全フォントを調べる（Linux では fc-list を実行する）ので、
+起動のたびに数百ms かかることがある。見つけたフォントファイルのパス（見つからなかったことも含む）を覚えておき、
+次回からは探さずにそのファイルを直接開く
+同梱のフォントファイルを指定した場合は探さない（shoot.py --font FILE）
+"""
+import json
+import os
+
+import pygame
+
+from assets import CACHE_DIR
+
+# 探すフォント名（先にあるものを優先する。日本語を表示できるもの）
+FONT_NAMES = ["meiryo", "yugothic", "msgothic", "notosanscjkjp", "notosansjp", "ipagothic", "ipaexgothic", "takaogothic"]
+
+# 探した結果の保存先
+FONT_CACHE_PATH = os.path.join(CACHE_DIR, "fonts.json")
+
+
+def find_font(names:list, path:str | None=None, rescan:bool=False) -> tuple:
+    """
+    使うフォントファイルを決める
+    引数 names: 探すフォント名のリスト
+    引数 path: 同梱のフォントファイル（指定すれば探さずにこれを使う）
+    引数 rescan: キャッシュを使わずに探し直す
+    戻り値: (フォントファイルのパス（見つからなければ None = pygame の標準フォント）, どう決めたか)
+    """
+    if path:
+        return path, "指定"
+    if not rescan:
+        try:
+            with open(FONT_CACHE_PATH, encoding="utf-8") as f:
+                cached = json.load(f)
+            # 名前の候補が変わったり、ファイルが消えていたら探し直す
+            if cached["names"] == names and (cached["path"] is None or os.path.exists(cached["path"])):
+                return cached["path"], "キャッシュ"
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    found = pygame.font.match_font(names) # ここでシステムのフォント一覧を調べる（遅い）
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(FONT_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"names": names, "path": found}, f, ensure_ascii=False)
+    except OSError:
+        pass # 保存できなくても次回また探すだけ
+    return found, "探索"
+
+
+def load_fonts(path:str | None, sizes:tuple) -> list:
+    """
+    フォントファイルを大きさごとに開く（開けなければ pygame の標準フォントにする）
+    引数 path: フォントファイルのパス（None なら標準フォント）
+    引数 sizes: 大きさのリスト
+    戻り値: pygame.font.Font のリスト
+    """
+    try:
+        return [pygame.font.Font(path, size) for size in sizes]
+    except (OSError, pygame.error):
+        print(f"フォントファイル {path} を開けません。標準フォントを使用します。")
+        return [pygame.font.Font(None, size) for size in sizes]
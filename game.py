@@ -0,0 +1,1024 @@
+import math
+import os
+import random
+import threading
+
+import numpy as np
+import pygame
+
+from bullet_store import BulletArray
+from enemy_store import EnemyBatch
+from hitbox import CircleHitbox, collide_hitbox
+from spatial_hash import PointGrid, SpatialHash
+from replay import MaskKeys
+from assets import load_cutout_image, load_keyed_image, preload_in_background
+from atlas import AtlasLayer, SpriteAtlas, SpriteLayer
+from particles import ParticleArray
+import danmaku
+from telemetry import EV_BOSS_KILL, EV_BOSS_PHASE, EV_BOSS_SPAWN, EV_GAME_OVER, EV_KILL, EV_SESSION, EV_SPAWN
+
+SCREEN_WIDTH = 600
+SCREEN_HEIGHT = 800
+FPS = 60
+
+# 画像の置き場所（作業ディレクトリによらず、このファイルの隣の fig/）
+FIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fig")
+
+# 色定義
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+BLUE = (0, 0, 255)
+YELLOW = (255, 255, 0)
+PURPLE = (128, 0, 128)
+CYAN = (0, 255, 255)
+PINK = (255, 130, 187)
+
+# 敵の種類
+ENEMY_TYPE_NORMAL = 0
+ENEMY_TYPE_WAVY = 1
+ENEMY_TYPE_SHOOTER = 2
+
+# 敵の種類ごとの色と動き（EnemyBatch の引数: 下へ進む速さ、蛇行の振れ幅、狙い撃ちの間隔と弾速）
+ENEMY_COLORS = {ENEMY_TYPE_NORMAL: RED, ENEMY_TYPE_WAVY: GREEN, ENEMY_TYPE_SHOOTER: YELLOW}
+ENEMY_MOVES = {
+    ENEMY_TYPE_NORMAL: {"speed_y": 3},                                         # 直進
+    ENEMY_TYPE_WAVY: {"speed_y": 2, "wave": 5},                                # 蛇行
+    ENEMY_TYPE_SHOOTER: {"speed_y": 1, "shoot_interval": 120, "shot_speed": 5}, # 狙い撃ち
+}
+
+# ボス出現スコア間隔
+BOSS_APPEAR_INTERVAL = 150
+
+# 誘導弾が1フレームに曲がれる最大の角度（ラジアン）と寿命（フレーム数）
+HOMING_TURN = math.radians(6)
+HOMING_LIFE = 180
+
+# 当たり判定の半径(px)：自機の判定点と敵弾（見た目より小さくして、かすっただけでは当たらないようにする）
+PLAYER_HIT_RADIUS = 4
+ENEMY_BULLET_HIT_RADIUS = 3
+
+# 爆発・ヒットのパーティクル（1か所あたりの数, 最大の速さ(px/フレーム), 寿命(フレーム数), 色）
+# ザコ敵の爆発の色は敵の色、ボスへの命中と弾消しは当たった弾ごとに1か所
+ENEMY_DEATH_BURST = (12, 3.0, 20)
+BOSS_HIT_BURST = (2, 2.5, 8, WHITE)
+BOSS_DEATH_BURST = (120, 7.0, 45, YELLOW)
+MELEE_CANCEL_BURST = (2, 1.5, 10, PINK)
+BOMB_CANCEL_BURST = (1, 2.0, 16, YELLOW)
+
+# 1ゲームで使える必殺技（画面内の敵弾の一括消去）の回数
+BOMB_STOCK = 3
+
+# 描画の補間で、1フレームでこれ(px)より大きく動いたスプライトは補間せず今の位置に描く
+INTERP_SNAP_DIST = 64
+
+# --- クラス定義 ---
+
+# 弾画像のキャッシュ {(種類, サイズ, 色): Surface}
+bullet_image_cache = {}
+
+def get_bullet_image(kind:str, size:int, color:tuple) -> pygame.Surface:
+    """
+    弾画像を種類・サイズ・色ごとに一度だけ作って使い回す
+    引数 kind: 弾の種類 ("rect": 四角弾, "circle": 丸弾, "ofuda": お札弾)
+    引数 size: 弾のサイズ
+    引数 color: 弾の色
+    """
+    key = (kind, size, color)
+    image = bullet_image_cache.get(key)
+    if image is None:
+        if kind == "circle":
+            image = pygame.Surface((size, size))
+            pygame.draw.circle(image, color, (size//2, size//2), size//2)
+            image.set_colorkey(BLACK)
+        elif kind == "ofuda":
+            # お札風の長方形（白地に赤枠）
+            image = pygame.Surface((10, 14))
+            image.fill(WHITE)
+            pygame.draw.rect(image, color, (2, 2, 6, 10))
+        else:
+            image = pygame.Surface((size, size))
+            image.fill(color)
+        bullet_image_cache[key] = image
+    return image
+
+
+class Bullet(pygame.sprite.Sprite):
+
+    """
+    弾クラス（修正版）
+    寿命(life)と近接属性(is_melee)を追加
+    画像はキャッシュを共有し、kill()されたインスタンスはプールに戻して再利用する
+    """
+    pool = [] # kill()されて再利用を待っている弾
+
+    def __init__(self, x:float, y:float, vy:float, vx:float=0, is_player_bullet:bool=True, color:tuple=WHITE, pierce:bool=False, damage:int=1, is_melee:bool=False, life:int=0, size:int=0, kind:str="") -> None:
+        """
+        弾の設定
+        引数 x,y: 弾の座標
+        引数 vx,vy: 弾の速度
+        引数 is_player_bullet: プレイヤーの弾かどうか
+        引数 color: 弾の色
+        引数 pierce: 貫通判定の有無
+        引数 damge: ボスに与えるダメージ量
+        引数 is_melee: 近接キャラかどうか
+        引数 size: 弾のサイズ
+        引数 life: 弾の寿命
+        引数 kind: 弾の見た目の種類（省略時はプレイヤー弾なら四角、敵弾なら赤玉）
+        """
+        super().__init__()
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.setup(x, y, vy, vx, is_player_bullet, color, pierce, damage, is_melee, life, size, kind)
+
+    def setup(self, x:float, y:float, vy:float, vx:float=0, is_player_bullet:bool=True, color:tuple=WHITE, pierce:bool=False, damage:int=1, is_melee:bool=False, life:int=0, size:int=0, kind:str="") -> None:
+        """
+        弾の状態を設定する（新規作成時とプールからの再利用時に共通）
+        引数は __init__ と同じ
+        """
+        # sizeが指定されていなければデフォルト値を使う
+        if size == 0:
+            size = 10 if is_player_bullet else 8
+
+        if not kind:
+            # プレイヤー弾は引数で色を指定可能な四角、敵弾は赤玉
+            kind = "rect" if is_player_bullet else "circle"
+        if kind == "circle" and not is_player_bullet:
+            color = RED
+
+        self.image = get_bullet_image(kind, size, color)
+        self.damage = damage
+        self.pierce = pierce
+        self.is_melee = is_melee # 近接攻撃かどうか
+        self.life = life         # 寿命（フレーム数）。0なら無限（画面外まで）
+        self.target = None       # 誘導弾が狙っている敵（homing_bullets に入っている弾だけが使う）
+
+        self.rect.size = self.image.get_size()
+        self.rect.center = (x, y)
+        self.vy = vy
+        self.vx = vx
+
+    @classmethod
+    def spawn(cls, *args, **kwargs) -> "Bullet":
+        """
+        プールに空きがあれば再利用し、なければ新しく弾を作る
+        引数は __init__ と同じ
+        """
+        if cls.pool:
+            bullet = cls.pool.pop()
+            bullet.setup(*args, **kwargs)
+            return bullet
+        return cls(*args, **kwargs)
+
+    def kill(self) -> None:
+        """
+        全グループから外し、プールに戻す
+        """
+        if self.alive(): # 二重にプールへ戻さない
+            super().kill()
+            self.target = None # プールの中で倒した敵（とそのゲーム）を掴んだままにしない
+            Bullet.pool.append(self)
+
+    def update(self) -> None:
+        """
+        弾の移動処理と画面外削除、寿命管理
+        """
+        self.rect.y += self.vy
+        self.rect.x += self.vx
+        
+        # 寿命がある弾（近接攻撃など）の処理
+        if self.life > 0:
+            self.life -= 1
+            if self.life <= 0:
+                self.kill() # 寿命が尽きたら消える
+
+        # 画面外に出たら削除
+        if self.rect.bottom < -50 or self.rect.top > SCREEN_HEIGHT + 50 or \
+           self.rect.left < -50 or self.rect.right > SCREEN_WIDTH + 50:
+            self.kill()
+
+class ShotPattern:
+    """
+    自機の1回の発射で出る弾の並び（武器の仕様）
+    角度ごとの速度ベクトルは作成時に一度だけ計算しておき、発射時は表を引くだけにする
+    """
+    def __init__(self, angles:list, speed:float, color:tuple, pierce:bool=False, damage:int=1, size:int=0, life:int=0, kind:str="") -> None:
+        """
+        引数 angles: 弾の角度のリスト（度、0が真上、正が右）
+        引数 speed: 弾速
+        引数 color: 弾の色
+        引数 pierce, damage, size, life, kind: Bullet と同じ
+        """
+        # 真上を0度とした向きの単位ベクトル (sin, -cos)
+        self.directions = [(math.sin(math.radians(angle)), -math.cos(math.radians(angle))) for angle in angles]
+        self.speed = speed
+        self.velocities = self._scale(speed)
+        self.color = color
+        self.pierce = pierce
+        self.damage = damage
+        self.size = size
+        self.life = life
+        self.kind = kind
+
+    def _scale(self, speed:float) -> list:
+        """
+        弾速 speed のときの速度ベクトル (vx, vy) のリストを返す
+        """
+        return [(dx * speed, dy * speed) for dx, dy in self.directions]
+
+    def fire(self, game:"Game", x:float, y:float, speed:float | None=None, damage:int | None=None, size:int | None=None) -> None:
+        """
+        1回分の弾をまとめて発射する
+        引数 game: 弾を追加するゲーム
+        引数 x,y: 発射位置
+        引数 speed, damage, size: 指定するとこの発射だけ仕様を上書きする（チャージショット用）
+        """
+        velocities = self.velocities if speed is None else self._scale(speed)
+        damage = self.damage if damage is None else damage
+        size = self.size if size is None else size
+        bullets = [Bullet.spawn(x, y, vy, vx, is_player_bullet=True, color=self.color, pierce=self.pierce,
+                                damage=damage, life=self.life, size=size, kind=self.kind)
+                   for vx, vy in velocities]
+        game.all_sprites.add(*bullets)
+        game.player_bullets.add(*bullets)
+
+
+class Player(pygame.sprite.Sprite):
+    """
+    自機の親クラス（共通機能）
+    """
+    pattern = None # 通常ショットの弾の並び（ShotPattern）
+    hitbox = CircleHitbox(PLAYER_HIT_RADIUS) # 当たり判定は中心の判定点だけ
+
+    def __init__(self, game:"Game") -> None:
+        """
+        自機の共通機能の設定
+        引数 game: 自機が属するゲーム
+        """
+        super().__init__()
+        self.game = game
+        self.image = pygame.Surface((30, 30)) 
+        self.rect = self.image.get_rect()
+        self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50)
+        self.speed = 5
+        self.last_shot_time = 0
+        self.shoot_interval = 80
+
+    @staticmethod
+    def load_image() -> pygame.Surface | None:
+        """
+        キャラの画像を読み込む（画像を使うキャラだけが上書きする）
+        起動時にタイトル画面の裏で先読みしておき (preload_characters)、キャラ選択時は読み込み済みの画像を使う
+        """
+        return None
+    
+    def update(self) -> None:
+        """
+        自機の移動処理の設定
+        """
+        current_speed = self.speed
+        # Shiftキーで低速移動
+        if self.game.keys[pygame.K_LSHIFT] or self.game.keys[pygame.K_RSHIFT]:
+            current_speed = self.speed / 2
+
+        if self.game.keys[pygame.K_LEFT] and self.rect.left > 0:
+            self.rect.x -= current_speed
+        if self.game.keys[pygame.K_RIGHT] and self.rect.right < SCREEN_WIDTH:
+            self.rect.x += current_speed
+        if self.game.keys[pygame.K_UP] and self.rect.top > 0:
+            self.rect.y -= current_speed
+        if self.game.keys[pygame.K_DOWN] and self.rect.bottom < SCREEN_HEIGHT:
+            self.rect.y += current_speed
+
+
+    def shoot(self) -> None:
+        """
+        Zキーが押されていれば、発射間隔ごとに self.pattern の弾を撃つ
+        pattern で表せない撃ち方をするキャラは子クラスでオーバーライド（上書き）する
+        """
+        if self.pattern is None or not self.game.keys[pygame.K_z]:
+            return
+        now = self.game.get_ticks()
+        if now - self.last_shot_time > self.shoot_interval:
+            self.pattern.fire(self.game, self.rect.centerx, self.rect.top)
+            self.last_shot_time = now
+
+class PlayerBalance(Player):
+    """
+    Type A: バランス型(青)
+    """
+    pattern = ShotPattern([0, -15, 15], 10, CYAN) # 3WAY弾 (シアン)
+
+    def __init__(self, game:"Game") -> None:
+        """
+        バランス型の各種設定
+        """
+        super().__init__(game)
+        self.image.fill(BLUE)
+        self.speed = 5
+        self.shoot_interval = 80
+
+class PlayerSpeed(Player):
+    """
+    Type B: 高速移動型（赤）
+    """
+    pattern = ShotPattern([0, -15, 15], 10, (255, 100, 100)) # 3WAY弾 (少し赤い白)
+
+    def __init__(self, game:"Game") -> None:
+        """
+        高速移動型の各種設定
+        """
+        super().__init__(game)
+        self.image.fill(RED)
+        self.speed = 8
+        self.shoot_interval = 80 
+
+
+class PlayerShotgun(Player):
+    """
+    Type C: ショットガン型
+    """
+    pattern = ShotPattern([-20, -15, -10, -5, 0, 5, 10, 15, 20], 12, GREEN) # 9WAY弾
+
+    def __init__(self, game:"Game") -> None:
+        """
+        ショットガン型の各種設定
+        """
+        super().__init__(game)
+        self.image.fill(GREEN)
+        self.speed = 4
+        self.shoot_interval = 200
+        try:
+            self.image = self.load_image()
+        except FileNotFoundError as e:
+            print(f"画像ファイル {e.filename} が見つかりません。緑色の矩形を使用します。")
+            self.image = pygame.Surface((30, 30))
+            self.image.fill(GREEN)
+
+        self.rect = self.image.get_rect()
+        self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50)
+
+    @staticmethod
+    def load_image() -> pygame.Surface:
+        """
+        縮小して背景色（左上の色）に近い部分を透過した画像を読み込む（加工結果はディスクにキャッシュ）
+        色の許容範囲 (Threshold): この数値を大きくすると、より広い範囲の色が消えます。
+        """
+        return load_keyed_image(os.path.join(FIG_DIR, "shot.png"), (50, 50), 60)
+
+
+class PlayerReimu(Player):
+    """
+    Type D: 博麗霊夢風のホーミング（誘導）機体
+    最も近い敵を自動で索敵し、追尾する弾を発射する。
+    """
+    def __init__(self, game:"Game") -> None:
+        """
+        コンストラクタ
+        機体の色や速度、弾の連射速度を初期化する。
+        """
+        super().__init__(game)
+        self.image.fill(WHITE)
+        self.speed: int = 5            # 標準速度
+        self.shoot_interval: int = 120 # 誘導弾は強力なので連射は遅めに設定
+
+    def shoot(self) -> None:
+        """
+        最も近い敵に向かって誘導弾を発射する。
+        敵がいない場合は真上に発射する。
+        """
+        if not self.game.keys[pygame.K_z]:
+            return
+        now = self.game.get_ticks()
+        # 前回の発射から一定時間経過しているか確認
+        if now - self.last_shot_time > self.shoot_interval:
+            # 画面内で最も近い敵を取得するメソッドを呼ぶ（2発とも同じ敵を狙うので1回だけ）
+            target: Enemy | None = self.get_nearest_enemy()
+
+            # 左右の少しズレた位置から2発発射するためのオフセット
+            offsets = [-15, 15]
+            for offset_x in offsets:
+                angle: float = 0.0
+                if target:
+                    # 敵がいる場合：敵の方向への角度(ラジアン)を計算
+                    # atan2(yの差分, xの差分) で角度が求まる
+                    dx = target.rect.centerx - (self.rect.centerx + offset_x)
+                    dy = target.rect.centery - self.rect.top
+                    angle = math.atan2(dy, dx)
+                else:
+                    # 敵がいない場合：真上 (-90度 = -pi/2 ラジアン)
+                    angle = -math.pi / 2
+
+                # 弾速の設定 (ホーミング弾は挙動が見えやすいよう少し遅め)
+                speed: float = 8.0
+                vx: float = math.cos(angle) * speed # 横方向の速度成分
+                vy: float = math.sin(angle) * speed # 縦方向の速度成分
+                
+                # 弾の生成 (お札風の長方形: 白地に赤い枠線)
+                # 発射後も Game.steer_homing() が毎フレーム狙った敵へ曲げる。回り続けないよう寿命をつける
+                bullet = Bullet.spawn(self.rect.centerx + offset_x, self.rect.top, vy, vx, is_player_bullet=True, color=RED, kind="ofuda", life=HOMING_LIFE)
+                
+                # スプライトグループに追加
+                self.game.all_sprites.add(bullet)
+                self.game.player_bullets.add(bullet)
+                bullet.target = target
+                self.game.homing_bullets.add(bullet)
+            
+            # 最終発射時間を更新
+            self.last_shot_time = now
+
+    def get_nearest_enemy(self) -> any:
+        """
+        現在画面内にいる敵（ボス戦中はボスも含む）の中から、自機に最も近い敵を返す。
+        探索はフレームごとに一度だけ作るゲームの索敵グリッド (Game.nearest_target) で行う。
+        Returns:
+            Enemy | None: 最も近い敵インスタンス。敵がいない場合はNone。
+        """
+        return self.game.nearest_target(self.rect.centerx, self.rect.centery)
+    
+
+class PlayerMelee(Player):
+    """
+    Type G: 近接型
+    """
+    def __init__(self, game:"Game") -> None:
+        """
+        近接型の各種設定
+        """
+        super().__init__(game)
+        # 画像読み込み（なければ四角形で代用）
+        try:
+            self.image = self.load_image()
+        except FileNotFoundError as e:
+            print(f"画像ファイル {e.filename} が見つかりません。黄色の矩形を使用します。")
+            self.image = pygame.Surface((40, 40))
+            self.image.fill(YELLOW)
+            
+        self.rect = self.image.get_rect()
+        self.rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50)
+
+        self.speed = 6
+        self.shoot_interval = 15 # 連射速度速い（近接攻撃）
+
+    @staticmethod
+    def load_image() -> pygame.Surface:
+        """
+        白っぽい背景を透過して切り抜き、50x50に縮小した画像を読み込む（加工結果はディスクにキャッシュ）
+        """
+        return load_cutout_image(os.path.join(FIG_DIR, "Gemini_Generated_Image_5a8oni5a8oni5a8o.png"), (50, 50), 200)
+        
+    def shoot(self) -> None:
+        """
+        近接型の射撃機構
+        """
+        
+        if not self.game.keys[pygame.K_z]:
+            return
+        
+        now = self.game.get_ticks()
+        if now - self.last_shot_time > self.shoot_interval:
+            # 近接攻撃（剣を振るイメージの短射程・高威力弾）
+            # is_melee=True を指定して、敵弾を消せるようにする
+            
+            # 中央
+            bullet = Bullet.spawn(self.rect.centerx, self.rect.top, -15, 0, 
+                            is_player_bullet=True, color=YELLOW, size=20, life=15, is_melee=True)
+            # 左
+            bullet_l = Bullet.spawn(self.rect.centerx - 15, self.rect.top + 10, -15, -2, 
+                            is_player_bullet=True, color=YELLOW, size=15, life=10, is_melee=True)
+            # 右
+            bullet_r = Bullet.spawn(self.rect.centerx + 15, self.rect.top + 10, -15, 2, 
+                            is_player_bullet=True, color=YELLOW, size=15, life=10, is_melee=True)
+
+            self.game.all_sprites.add(bullet, bullet_l, bullet_r)
+            self.game.player_bullets.add(bullet, bullet_l, bullet_r)
+            self.game.melee_bullets.add(bullet, bullet_l, bullet_r)
+            self.last_shot_time = now
+
+
+class PlayerSwitch(Player):
+    """
+    Type E: 射撃モード切替型
+    """
+    # 射撃モードごとの (弾の並び, 発射間隔)
+    mode_patterns = {
+        2: (ShotPattern([-10, 10], 10, PINK), 80), # 2WAY
+        1: (ShotPattern([0], 10, PINK), 20),       # 1WAY高速連射
+    }
+
+    def __init__(self, game:"Game") -> None:
+        """
+        射撃モード切替型の各種設定
+        """
+        super().__init__(game)
+        self.image.fill(PINK)
+        self.speed = 5
+        self.shoot_mode = 2 # 2wayスタート
+        self.last_toggle_time = 0 # 連打防止
+
+    def shoot(self) -> None:
+        """
+        射撃モード切替型の射撃機構（今のモードの弾の並びと発射間隔で撃つ）
+        """
+        self.pattern, self.shoot_interval = self.mode_patterns[self.shoot_mode]
+        super().shoot()
+        
+    def toggle_mode(self) -> None:
+        """
+        射撃モード切替型専用
+        Xキーで射撃モード切替
+        """
+        now = self.game.get_ticks()
+        if now -self.last_toggle_time > 300: # 0.3秒クールタイム
+            self.shoot_mode = 1 if self.shoot_mode == 2 else 2
+            self.last_toggle_time = now
+
+class PlayerCharge(Player):
+    """
+    Type F: チャージショット型（水色）
+    """
+    pattern = ShotPattern([0, -15, 15], 8, CYAN, pierce=True) # 弾速・威力・サイズは発射時にチャージ量で上書きする
+
+    def __init__(self, game:"Game") -> None:
+        """
+        チャージショット型の各種設定
+        """
+        super().__init__(game)
+        self.image.fill(CYAN)
+        self.speed = 5
+
+        # チャージ関連
+        self.is_charging = False
+        self.charge_time = 0
+        self.max_charge = 120  # フレーム上限
+
+    def shoot(self) -> None:
+        """
+        チャージショット型の射撃機構
+        """
+        # Zキーが押されている間：チャージ
+        if self.game.keys[pygame.K_z]:
+            self.is_charging = True
+            self.charge_time = min(self.charge_time + 1, self.max_charge)
+
+        # Zキーを離した瞬間：発射
+        elif self.is_charging:
+            # 発射処理
+            power = self.charge_time
+            self.is_charging = False
+            self.charge_time = 0
+
+            #チャージ時間に応じて弾の性能を変える
+            damage = 1 + power // 5
+            size = 10 + power // 4
+            speed = 8 + power // 5
+
+            self.pattern.fire(self.game, self.rect.centerx, self.rect.top, speed=speed, damage=damage,
+                              size=size) # 見た目強化（サイズ変更）
+
+            # リセット
+            self.is_charging = False
+            self.charge_time = 0
+
+# ★★★ キャラクターリストの定義 ★★★
+# ここに辞書を追加していくだけで、選択肢が増えます
+CHAR_LIST = [
+    {"name": "Type A: Balance", "desc": "バランス型", "color": BLUE,  "class": PlayerBalance},
+    {"name": "Type B: Speed",   "desc": "高速移動型", "color": RED,   "class": PlayerSpeed},
+    {"name": "Type C: Shotgun", "desc": "広範囲攻撃", "color": GREEN, "class": PlayerShotgun},
+    {"name": "Type D: Reimu", "desc": "誘導弾幕", "color": WHITE, "class": PlayerReimu},
+    {"name": "Type E: Switch", "desc": "射撃切替", "color": PINK, "class": PlayerSwitch},
+    {"name": "Type F: Charge", "desc": "チャージ攻撃", "color": CYAN, "class" :PlayerCharge},
+    {"name": "Type G: Melee",   "desc": "近接斬撃(弾消し)", "color": YELLOW, "class": PlayerMelee},
+    # 例: {"name": "Type D: Power", "desc": "高火力", "color": PURPLE, "class": PlayerPower}, 
+]
+
+class Enemy(pygame.sprite.Sprite):
+    """
+    ザコ敵クラス
+    移動と狙い撃ちは種類ごとの EnemyBatch がまとめて行う（このスプライトは衝突判定と描画に使う）
+    """
+    def __init__(self, game:"Game", enemy_type:int) -> None:
+        """
+        敵の設定
+        引数 game: 敵が属するゲーム
+        引数 enemy_type: 敵のタイプの種類
+        """
+        super().__init__()
+        self.game = game
+        self.enemy_type = enemy_type
+        self.image = get_bullet_image("rect", 30, ENEMY_COLORS[enemy_type]) # 同じ種類の敵は画像を共有する
+
+        self.rect = self.image.get_rect()
+        self.rect.x = game.rng.randrange(0, SCREEN_WIDTH - self.rect.width)
+        self.rect.y = -50
+
+class Boss(pygame.sprite.Sprite):
+    """
+    ボスクラス
+    """
+    def __init__(self, game:"Game", level:int=1) -> None:
+        """
+        ボスの設定
+        引数 game: ボスが属するゲーム
+        引数 level: ボスのレベル(HPや弾幕の強度に影響)
+        """
+        super().__init__()
+        self.game = game
+        self.image = pygame.Surface((60, 60))
+        self.image.fill(PURPLE)
+        self.rect = self.image.get_rect()
+        self.rect.center = (SCREEN_WIDTH // 2, -100)
+        
+        self.level = level
+        self.max_hp = 100 * level
+        self.hp = self.max_hp
+        self.state = "entry"
+        self.timer = 0
+        self.patterns = danmaku.boss_patterns(level) # レベルに応じた弾幕
+
+    def update(self) -> None:
+        """
+        ボスの行動更新
+        """
+        if self.state == "entry":
+            self.rect.y += 2
+            if self.rect.y >= 100:
+                self.state = "battle"
+                self.game.emit(EV_BOSS_PHASE, a=self.level)
+        
+        elif self.state == "battle":
+            self.timer += 1
+            self.rect.x = (SCREEN_WIDTH // 2) + math.sin(self.timer * 0.05) * 150
+            
+            self.shoot_danmaku()
+
+    def shoot_danmaku(self) -> None:
+        """
+        このフレームに撃つ弾幕パターンの弾をまとめて発射
+        """
+        player = self.game.player
+        target = player.rect.center if player else None
+        danmaku.fire(self.patterns, self.game.enemy_bullets, self.timer, self.rect.centerx, self.rect.centery, target)
+
+
+
+
+def preload_characters() -> threading.Thread:
+    """
+    全キャラの画像を別スレッドで先読みする（タイトル画面を表示している間に済ませ、キャラ選択時に待たないようにする）
+    戻り値: 読み込み中のスレッド
+    """
+    return preload_in_background([char_data["class"].load_image for char_data in CHAR_LIST])
+
+
+class Game:
+    """
+    ゲーム本体（エンジン）
+    スプライトグループ・スコア・乱数などの状態をすべて持ち、1フレームずつ進める
+    ウィンドウやメニュー画面とは独立しているので、ベンチマークなどから直接動かしたり、複数同時に動かしたりできる
+
+    使い方:
+        game = Game()
+        game.reset(char_idx=0, seed=1)
+        while not game.game_over:
+            game.step(input_mask)
+    """
+    def __init__(self, spawn_rate:float=0.03, invincible:bool=False, boss_level:int | None=None, interpolate:bool=False) -> None:
+        """
+        引数 spawn_rate: 1フレームあたりのザコ敵の出現確率
+        引数 invincible: 被弾してもゲームオーバーにしない（計測用）
+        引数 boss_level: 指定するとこのレベルのボスがすぐ出現する状態で開始する
+        引数 interpolate: 1フレーム前のスプライトの位置を覚えて、render() で間の位置に描けるようにする
+        """
+        self.spawn_rate = spawn_rate
+        self.invincible = invincible
+        self.start_boss_level = boss_level
+        self.interpolate = interpolate
+
+        # グループ作成
+        self.all_sprites = pygame.sprite.Group() # 更新するスプライト全部（描画は draw_layers で行う）
+        self.enemies = pygame.sprite.Group()
+        self.enemy_batches = {t: EnemyBatch(**move) for t, move in ENEMY_MOVES.items()} # 種類ごとにまとめて動かす
+        self.boss_group = pygame.sprite.Group()
+        self.player_bullets = pygame.sprite.Group()
+        self.homing_bullets = pygame.sprite.Group() # 毎フレーム敵の方へ曲がる自機弾（player_bullets にも入っている）
+        self.melee_bullets = pygame.sprite.Group()  # 敵弾を消せる近接攻撃の弾（player_bullets にも入っている）
+        self.player_group = pygame.sprite.GroupSingle()
+
+        # 敵弾は数千発規模になるのでSpriteではなく配列でまとめて管理する
+        self.enemy_bullets = BulletArray(get_bullet_image("circle", 8, RED), (SCREEN_WIDTH, SCREEN_HEIGHT),
+                                         hit_radius=ENEMY_BULLET_HIT_RADIUS)
+
+        # 爆発・ヒットの演出（固定長の配列で、見た目専用の乱数を使う）
+        self.particles = ParticleArray()
+
+        # 描画は奥から順にレイヤーごとに1回の blits で行う（弾と敵の画像は1枚のアトラスにまとめて描く）
+        self.atlas = SpriteAtlas()
+        self.draw_layers = [
+            AtlasLayer(self.atlas, self.enemies),
+            SpriteLayer(self.boss_group),
+            AtlasLayer(self.atlas, self.player_bullets),
+            SpriteLayer(self.player_group),
+        ]
+
+        self.collision_grid = SpatialHash() # 衝突判定用の空間ハッシュ
+        self.target_grid = PointGrid()      # 誘導弾の索敵用（フレームごとに最初の問い合わせで作り直す）
+        self.target_frame = -1              # target_grid を作ったフレーム
+
+        self.rng = random.Random() # このゲーム専用の乱数（インスタンスごとに独立）
+        self.seed = None
+        self.char_idx = 0
+        self.player = None
+        self.keys = MaskKeys(0) # このフレームのキー入力（全ての入力処理はこれを読む）
+        self.frame = 0          # ゲーム開始からの経過フレーム数（シミュレーション時間）
+        self.prev_positions = {} # interpolate 時の、直前の step() を始めたときのスプライトの位置
+        self.telemetry = None    # 出現・撃破などのイベントの記録先（telemetry.Telemetry。None なら記録しない）
+
+        # ゲーム変数
+        self.score = 0
+        self.next_boss_score = BOSS_APPEAR_INTERVAL
+        self.boss_level = 1
+        self.is_boss_active = False
+        self.game_over = False
+        self.bombs = BOMB_STOCK
+        self.bomb_held = False # 前のフレームで必殺技のキーを押していたか（押しっぱなしで続けて使わない）
+
+    def get_ticks(self) -> int:
+        """
+        ゲーム内の経過時間(ms)を返す
+        実時間ではなく、1フレーム = 1000/FPS ms の固定刻みで進むシミュレーション時間
+        （発射間隔などのタイマーはすべてこれか経過フレーム数で測り、処理落ちしても進み方が変わらないようにする）
+        """
+        return self.frame * 1000 // FPS
+
+    def reset(self, char_idx:int, seed:int | None=None) -> int:
+        """
+        選択したキャラでゲームを開始する
+        引数 char_idx: CHAR_LIST の添字
+        引数 seed: 乱数シード（Noneならランダムに決める）
+        戻り値: 使った乱数シード
+        """
+        # 乱数とシミュレーション時間を初期化して、同じシードと入力なら同じ展開になるようにする
+        if seed is None:
+            seed = random.SystemRandom().randrange(2**31)
+        self.rng.seed(seed)
+        self.seed = seed
+        self.char_idx = char_idx
+        self.frame = 0
+        self.keys = MaskKeys(0)
+        self.bombs = BOMB_STOCK
+        self.bomb_held = False # 前のフレームで必殺技のキーを押していたか（押しっぱなしで続けて使わない）
+
+        self.all_sprites.empty()
+        self.enemies.empty()
+        for batch in self.enemy_batches.values():
+            batch.clear()
+        self.boss_group.empty()
+        self.player_bullets.empty()
+        self.homing_bullets.empty()
+        self.melee_bullets.empty()
+        self.enemy_bullets.empty()
+        self.particles.reset(seed)
+        self.target_frame = -1
+        self.prev_positions = {}
+
+        # リストからクラスを取り出してインスタンス化
+        PlayerClass = CHAR_LIST[char_idx]["class"]
+        self.player = PlayerClass(self)
+
+        self.all_sprites.add(self.player)
+        self.player_group.add(self.player)
+
+        self.score = 0
+        self.next_boss_score = BOSS_APPEAR_INTERVAL
+        self.boss_level = 1
+        if self.start_boss_level is not None:
+            # 指定レベルのボスからすぐ始める
+            self.next_boss_score = 0
+            self.boss_level = self.start_boss_level
+        self.is_boss_active = False
+        self.game_over = False
+        self.emit(EV_SESSION, char_idx, seed & 0x7FFFFFFF)
+        return seed
+
+    def step(self, input_mask:int, stats=None) -> bool:
+        """
+        1フレーム分ゲームを進める（入力・出現・移動・衝突判定）
+        引数 input_mask: このフレームのキー入力のビットマスク（replay.KEY_BITS）
+        引数 stats: 処理段階の時間を記録する FrameStats（省略可）
+        戻り値: ゲームオーバーになったか
+        """
+        if self.interpolate:
+            self.prev_positions = {sprite: sprite.rect.topleft for sprite in self.all_sprites}
+        self.keys = MaskKeys(input_mask)
+        player = self.player
+        player.shoot()
+        if isinstance(player, PlayerSwitch) and self.keys[pygame.K_x]:
+            player.toggle_mode()
+        # Cキーを押したフレームに必殺技を1回使う（消した弾は直後の敵弾の更新で詰め直される）
+        bomb = self.keys[pygame.K_c]
+        if bomb and not self.bomb_held and self.bombs > 0:
+            self.bombs -= 1
+            self.clear_enemy_bullets()
+        self.bomb_held = bomb
+
+        if not self.is_boss_active and self.score >= self.next_boss_score:
+            self.is_boss_active = True
+            boss = Boss(self, self.boss_level)
+            self.all_sprites.add(boss)
+            self.boss_group.add(boss)
+            self.emit(EV_BOSS_SPAWN, a=self.boss_level)
+            self.explode(self.enemies)
+            for e in self.enemies:
+                self.score += 10
+                e.kill()
+
+        if not self.is_boss_active:
+            if self.rng.random() < self.spawn_rate:
+                t_type = self.rng.choice([ENEMY_TYPE_NORMAL, ENEMY_TYPE_WAVY, ENEMY_TYPE_SHOOTER])
+                enemy = Enemy(self, t_type)
+                self.all_sprites.add(enemy)
+                self.enemies.add(enemy)
+                self.enemy_batches[t_type].add(enemy)
+                self.emit(EV_SPAWN, t_type)
+
+        self.steer_homing()
+        # 敵弾はザコ敵・ボスが撃つ前に動かす（このフレームに撃った弾は、次のフレームまで撃った位置に描く）
+        self.enemy_bullets.update()
+        self.all_sprites.update()
+        target = self.player.rect.center if self.player else None
+        for batch in self.enemy_batches.values():
+            batch.update(self.enemy_bullets, target, SCREEN_HEIGHT)
+        self.particles.update()
+        if stats is not None:
+            stats.mark("update")
+
+        self.collide()
+        if stats is not None:
+            stats.mark("collision")
+
+        self.frame += 1
+        return self.game_over
+
+    def emit(self, kind:int, arg:int=0, a:int=0, b:float=0.0) -> None:
+        """
+        テレメトリにイベントを記録する（記録先がなければ何もしない）
+        引数 kind: イベントの種類（telemetry.EV_*）
+        引数 arg, a, b: イベントの値（telemetry.Telemetry.log と同じ）
+        """
+        if self.telemetry is not None:
+            self.telemetry.log(self.frame, kind, arg, a, b)
+
+    def nearest_target(self, x:float, y:float) -> pygame.sprite.Sprite | None:
+        """
+        (x, y) に最も近い狙える敵を返す（誘導弾の索敵用）
+        対象は画面に出てきた(top >= 0)ザコ敵と、ボス戦中のボス
+        索敵グリッドはフレームごとに最初の問い合わせで一度だけ作る
+        引数 x,y: 問い合わせ点
+        """
+        if self.target_frame != self.frame:
+            candidates = [enemy for enemy in self.enemies if enemy.rect.top >= 0]
+            if self.is_boss_active:
+                candidates.extend(self.boss_group)
+            self.target_grid.rebuild(candidates)
+            self.target_frame = self.frame
+        return self.target_grid.nearest(x, y)
+
+    def steer_homing(self) -> None:
+        """
+        全ての誘導弾を、それぞれ狙っている敵の方向へまとめて曲げる
+        狙っていた敵が消えたら、その弾に最も近い敵を狙い直す（いなければまっすぐ進む）
+        1フレームに曲がる角度は HOMING_TURN まで、速さは変えない
+        """
+        bullets = []
+        goals = []
+        for bullet in self.homing_bullets:
+            target = bullet.target
+            if target is None or not target.alive():
+                target = bullet.target = self.nearest_target(*bullet.rect.center)
+            if target is not None:
+                bullets.append(bullet)
+                goals.append((target.rect.centerx - bullet.rect.centerx, target.rect.centery - bullet.rect.centery))
+        if not bullets:
+            return
+        goal = np.array(goals, dtype=np.float64)
+        vel = np.array([(bullet.vx, bullet.vy) for bullet in bullets], dtype=np.float64)
+        heading = np.arctan2(vel[:, 1], vel[:, 0])
+        turn = (np.arctan2(goal[:, 1], goal[:, 0]) - heading + np.pi) % (2 * np.pi) - np.pi
+        heading += np.clip(turn, -HOMING_TURN, HOMING_TURN)
+        speed = np.hypot(vel[:, 0], vel[:, 1])
+        vxs = (np.cos(heading) * speed).tolist()
+        vys = (np.sin(heading) * speed).tolist()
+        for bullet, vx, vy in zip(bullets, vxs, vys):
+            bullet.vx = vx
+            bullet.vy = vy
+
+    def collide(self) -> None:
+        """
+        衝突判定とその結果（撃破・スコア・被弾）の処理
+        """
+        # 衝突判定は空間ハッシュで近くの相手だけを調べる（結果はpygameの総当たりと同じ）
+        # 敵弾は配列なのでNumPyで一括判定する
+        grid = self.collision_grid
+        grid.rebuild(self.player_bullets, self.enemies, self.boss_group)
+
+        hits = grid.groupcollide(self.enemies, self.player_bullets, True, False) #弾はいったん消さない
+        if hits:
+            self.explode(hits)
+        for enemy, bullets in hits.items():
+            self.score += 10
+            self.emit(EV_KILL, enemy.enemy_type)
+            for bullet in bullets:
+                if not getattr(bullet, "pierce", False):
+                    bullet.kill()
+        # ★追加: 近接攻撃(is_melee=True) vs 敵弾 の相殺処理
+        # 近接弾は専用のグループ(melee_bullets)にあるので、全ての近接弾の矩形でまとめて一度に敵弾を消す
+        # 近接弾は消えず(貫通)、敵弾だけ消える
+        if self.melee_bullets:
+            xs, ys = self.enemy_bullets.pop_in_rects([melee.rect for melee in self.melee_bullets])
+            if len(xs):
+                self.particles.burst(xs, ys, *MELEE_CANCEL_BURST)
+
+        if self.is_boss_active:
+            boss_hits = grid.groupcollide(self.boss_group, self.player_bullets, False, True)
+            for boss_sprite, bullets in boss_hits.items():
+                for b in bullets:
+                    boss_sprite.hp -= b.damage
+                    self.score += 1
+                # 当たった弾の位置から火花を出す（全弾分をまとめて1回で出す）
+                self.particles.burst([b.rect.centerx for b in bullets], [b.rect.top for b in bullets], *BOSS_HIT_BURST)
+                if boss_sprite.hp <= 0:
+                    self.score += 1000
+                    self.particles.burst(*boss_sprite.rect.center, *BOSS_DEATH_BURST)
+                    boss_sprite.kill()
+                    self.emit(EV_BOSS_KILL, a=self.boss_level)
+                    self.is_boss_active = False
+                    self.boss_level += 1
+                    self.next_boss_score = self.score + BOSS_APPEAR_INTERVAL
+
+        # 自機の被弾判定は矩形で候補を絞ってから、判定の形（自機は中心の判定点）で詳しく調べる
+        player = self.player
+        if grid.spritecollide(player, self.enemies, False, collide_hitbox) or \
+           self.enemy_bullets.collide_sprite(player) or \
+           grid.spritecollide(player, self.boss_group, False, collide_hitbox):
+            if not self.invincible:
+                self.game_over = True
+                self.emit(EV_GAME_OVER, a=self.score)
+
+    def explode(self, enemies) -> None:
+        """
+        倒れたザコ敵の爆発をまとめて出す（敵と同じ色で、種類ごとに1回）
+        引数 enemies: 倒れた敵の並び
+        """
+        centers = {}
+        for enemy in enemies:
+            centers.setdefault(enemy.enemy_type, []).append(enemy.rect.center)
+        for enemy_type, points in centers.items():
+            xs, ys = zip(*points)
+            self.particles.burst(xs, ys, *ENEMY_DEATH_BURST, ENEMY_COLORS[enemy_type])
+
+    def clear_enemy_bullets(self) -> int:
+        """
+        画面内の敵弾をすべて消す（必殺技などの全画面の弾消し用。近接攻撃の弾消しと同じ処理）
+        戻り値: 消した弾の数
+        """
+        xs, ys = self.enemy_bullets.pop_in_rects([pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)])
+        if len(xs):
+            self.particles.burst(xs, ys, *BOMB_CANCEL_BURST)
+        return len(xs)
+
+    def render(self, surface:pygame.Surface, track_dirty:bool=False, alpha:float=1.0) -> list:
+        """
+        スプライトと敵弾を描画する（背景の塗りつぶしやHUDは呼び出し側で行う）
+        引数 surface: 描画先
+        引数 track_dirty: 描画した範囲を集めるか（差分描画用）
+        引数 alpha: 1フレーム前の位置(0)から今の位置(1)までのどこに描くか（interpolate 時のみ有効）
+        戻り値: 描画した範囲の矩形のリスト（track_dirty でなければ空のことがある）
+        """
+        moved = []
+        if alpha < 1.0 and self.prev_positions:
+            # 描く間だけ rect を補間した位置へ動かす（差分描画で覚える描画位置も補間後になる）
+            for sprite, (x0, y0) in self.prev_positions.items():
+                rect = sprite.rect
+                x1, y1 = rect.topleft
+                if abs(x1 - x0) + abs(y1 - y0) > INTERP_SNAP_DIST:
+                    continue # 再利用された弾などのワープは補間しない
+                moved.append((rect, x1, y1))
+                rect.topleft = (round(x0 + (x1 - x0) * alpha), round(y0 + (y1 - y0) * alpha))
+        rects = []
+        for layer in self.draw_layers:
+            rects += layer.draw(surface, track_dirty)
+        for rect, x1, y1 in moved:
+            rect.topleft = (x1, y1)
+        alpha = alpha if self.interpolate else 1.0
+        rects += self.particles.draw(surface, track_dirty, alpha, self.atlas)
+        rects += self.enemy_bullets.draw(surface, track_dirty, alpha, self.atlas)
+        return rects
+
+    def counts(self) -> dict:
+        """
+        エンティティ数を返す（FrameStats.end_frame に渡す用）
+        """
+        return {"enemies": len(self.enemies), "player_bullets": len(self.player_bullets), "enemy_bullets": len(self.enemy_bullets),
+                "particles": len(self.particles)}
@@ -0,0 +1,150 @@
+"""
+当たり判定の形（ヒットボックス）
+スプライトはクラス属性 hitbox に判定の形を宣言する（宣言がなければ rect 全体）
+判定の形は必ず rect の内側に収める。rect 同士の重なりで候補を絞り（空間ハッシュ）、
+候補の組だけを collide_hitbox で正確に判定する
+
+    class Player(pygame.sprite.Sprite):
+        hitbox = CircleHitbox(3) # 中心の小さな円だけが当たり判定
+"""
+import functools
+import math
+
+import pygame
+
+
+class RectHitbox:
+    """
+    rect 全体を当たり判定にする（標準）
+    """
+    def __repr__(self) -> str:
+        return "RectHitbox()"
+
+
+class CircleHitbox:
+    """
+    rect の中心を中心とする円の当たり判定（自機の判定点・丸い弾など）
+    """
+    def __init__(self, radius:float) -> None:
+        """
+        引数 radius: 半径(px)
+        """
+        self.radius = radius
+
+    def __repr__(self) -> str:
+        return f"CircleHitbox({self.radius})"
+
+
+class MaskHitbox:
+    """
+    画像の不透明な部分だけを当たり判定にする（作るのは画像を読み込んだときの一度だけ）
+    """
+    def __init__(self, image:pygame.Surface) -> None:
+        """
+        引数 image: 判定の形にする画像（rect と同じ大きさであること）
+        """
+        self.mask = pygame.mask.from_surface(image)
+
+    def __repr__(self) -> str:
+        return f"MaskHitbox({self.mask.get_size()})"
+
+
+# 宣言がないスプライトの判定の形
+RECT = RectHitbox()
+
+
+def hitbox_of(sprite:pygame.sprite.Sprite):
+    """
+    スプライトの判定の形を返す
+    """
+    return getattr(sprite, "hitbox", RECT)
+
+
+@functools.lru_cache(maxsize=None)
+def circle_mask(radius:float) -> pygame.Mask:
+    """
+    半径 radius の円のマスク（マスクとの判定用。半径ごとに一度だけ作る）
+    大きさは (2r+1) 四方で、中心のピクセルが円の中心
+    """
+    r = math.ceil(radius)
+    mask = pygame.Mask((2 * r + 1, 2 * r + 1))
+    limit = radius * radius
+    for y in range(2 * r + 1):
+        for x in range(2 * r + 1):
+            if (x - r) ** 2 + (y - r) ** 2 <= limit:
+                mask.set_at((x, y), 1)
+    return mask
+
+
+@functools.lru_cache(maxsize=None)
+def rect_mask(size:tuple) -> pygame.Mask:
+    """
+    size の大きさの全面のマスク（マスクとの判定用。大きさごとに一度だけ作る）
+    """
+    return pygame.Mask(size, fill=True)
+
+
+def circle_rect(cx:float, cy:float, radius:float, rect:pygame.Rect) -> bool:
+    """
+    円と矩形が重なっているか
+    """
+    nx = min(max(cx, rect.left), rect.right - 1)
+    ny = min(max(cy, rect.top), rect.bottom - 1)
+    return (cx - nx) ** 2 + (cy - ny) ** 2 <= radius * radius
+
+
+def mask_overlap(mask:pygame.Mask, rect:pygame.Rect, other:pygame.Mask, x:int, y:int) -> bool:
+    """
+    rect の位置にある mask と、左上が (x, y) の other が重なっているか
+    """
+    return mask.overlap(other, (x - rect.left, y - rect.top)) is not None
+
+
+def _rect_rect(a, ra, b, rb) -> bool:
+    return ra.colliderect(rb)
+
+
+def _circle_rect(a, ra, b, rb) -> bool:
+    return circle_rect(ra.centerx, ra.centery, a.radius, rb)
+
+
+def _circle_circle(a, ra, b, rb) -> bool:
+    r = a.radius + b.radius
+    return (ra.centerx - rb.centerx) ** 2 + (ra.centery - rb.centery) ** 2 <= r * r
+
+
+def _mask_rect(a, ra, b, rb) -> bool:
+    return mask_overlap(a.mask, ra, rect_mask(rb.size), rb.left, rb.top)
+
+
+def _mask_circle(a, ra, b, rb) -> bool:
+    r = math.ceil(b.radius)
+    return mask_overlap(a.mask, ra, circle_mask(b.radius), rb.centerx - r, rb.centery - r)
+
+
+def _mask_mask(a, ra, b, rb) -> bool:
+    return mask_overlap(a.mask, ra, b.mask, rb.left, rb.top)
+
+
+# 判定の形の組ごとの詳細判定（逆順の組は引数を入れ替えて使う）
+_TESTS = {
+    (RectHitbox, RectHitbox): _rect_rect,
+    (CircleHitbox, RectHitbox): _circle_rect,
+    (CircleHitbox, CircleHitbox): _circle_circle,
+    (MaskHitbox, RectHitbox): _mask_rect,
+    (MaskHitbox, CircleHitbox): _mask_circle,
+    (MaskHitbox, MaskHitbox): _mask_mask,
+}
+
+
+def collide_hitbox(a:pygame.sprite.Sprite, b:pygame.sprite.Sprite) -> bool:
+    """
+    2つのスプライトの判定の形が重なっているか（rect 同士が重なっている候補の組に対して呼ぶ詳細判定）
+    pygame.sprite.spritecollide などの collided 引数にもそのまま渡せる
+    """
+    ha = hitbox_of(a)
+    hb = hitbox_of(b)
+    test = _TESTS.get((type(ha), type(hb)))
+    if test is not None:
+        return test(ha, a.rect, hb, b.rect)
+    return _TESTS[(type(hb), type(ha))](hb, b.rect, ha, a.rect)
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    """
+    文字列の描画結果を (フォント, 文字列, 色) ごとに保存して使い回すクラス
+    日本語フォントのラスタライズは重いので、同じ文字列は一度だけ描画する
+    """
+    def __init__(self, max_entries:int=256) -> None:
+        """
+        引数 max_entries: 保存する最大数（超えたら古いものから捨てる）
+        """
+        self.max_entries = max_entries
+        self.images = OrderedDict()
+
+    def render(self, font:pygame.font.Font, text:str, color:tuple) -> pygame.Surface:
+        """
+        文字列を描画した画像を返す（保存済みならそれを返す）
+        引数 font: フォント
+        引数 text: 文字列
+        引数 color: 文字色
+        """
+        key = (font, text, color)
+        image = self.images.get(key)
+        if image is not None:
+            self.images.move_to_end(key)
+            return image
+        image = font.render(text, True, color)
+        self.images[key] = image
+        if len(self.images) > self.max_entries:
+            self.images.popitem(last=False)
+        return image
+
+
+class CachedText:
+    """
+    値が変わったときだけ描き直す文字（スコアなど毎フレーム表示する数値用）
+    """
+    def __init__(self, font:pygame.font.Font, fmt:str, color:tuple) -> None:
+        """
+        引数 font: フォント
+        引数 fmt: 表示形式（例: "スコア: {}"）
+        引数 color: 文字色
+        """
+        self.font = font
+        self.fmt = fmt
+        self.color = color
+        self.value = None
+        self.image = None
+
+    def get(self, value) -> pygame.Surface:
+        """
+        値を表示した画像を返す
+        引数 value: 表示する値
+        """
+        if self.image is None or value != self.value:
+            self.value = value
+            self.image = self.font.render(self.fmt.format(value), True, self.color)
+        return self.image
+
+
+class HpBar:
+    """
+    HPが変わったときだけ描き直すHPバー
+    """
+    def __init__(self, size:tuple, back:tuple, fore:tuple, frame:tuple) -> None:
+        """
+        引数 size: バーの大きさ (幅, 高さ)
+        引数 back: 減った部分の色
+        引数 fore: 残りHPの色
+        引数 frame: 枠線の色
+        """
+        self.size = size
+        self.back = back
+        self.fore = fore
+        self.frame = frame
+        self.value = None
+        self.image = pygame.Surface(size)
+
+    def get(self, hp:int, max_hp:int) -> pygame.Surface:
+        """
+        HPバーの画像を返す
+        引数 hp: 現在のHP
+        引数 max_hp: 最大HP
+        """
+        if (hp, max_hp) != self.value:
+            self.value = (hp, max_hp)
+            width, height = self.size
+            pygame.draw.rect(self.image, self.back, (0, 0, width, height))
+            pygame.draw.rect(self.image, self.fore, (0, 0, width * (hp / max_hp), height))
+            pygame.draw.rect(self.image, self.frame, (0, 0, width, height), 2)
+        return self.image
@@ -0,0 +1,107 @@
+"""
+1フレーム分のキー入力（replay.KEY_BITS のビットマスク）を作る入力元
+Game.step() に渡すマスクを、キーボード・記録したリプレイ・自動操作ボットのどれからでも同じ形で取り出せる
+入力元は mask(game) でそのフレームのマスクを返し、finished(game) で入力が尽きたかを返す
+
+    source = BotInput()
+    while not source.finished(game):
+        game.step(source.mask(game))
+"""
+import numpy as np
+import pygame
+
+from bullet_store import FLAG_ALIVE
+from game import SCREEN_HEIGHT, Game, PlayerCharge, PlayerMelee
+from replay import KEY_BITS, Replay, keys_to_mask
+
+# ボットが避け始める距離(px)
+BOT_DANGER_RADIUS = 90
+
+# 近接型のボットが狙う相手の下に空ける距離(px)（近接弾が届く距離）
+BOT_MELEE_GAP = 120
+
+
+class KeyboardInput:
+    """
+    キーボードの今の状態を入力にする（イベント処理で pygame.event.get() を呼んだあとに使う）
+    """
+    def mask(self, game:Game) -> int:
+        return keys_to_mask(pygame.key.get_pressed())
+
+    def finished(self, game:Game) -> bool:
+        return False
+
+
+class ReplayInput:
+    """
+    --record で記録したプレイの入力をフレーム番号どおりに返す
+    """
+    def __init__(self, replay:Replay) -> None:
+        """
+        引数 replay: 読み込んだリプレイ
+        """
+        self.replay = replay
+
+    def mask(self, game:Game) -> int:
+        return self.replay.get(game.frame)
+
+    def finished(self, game:Game) -> bool:
+        """
+        記録の最後まで再現したか
+        """
+        return game.frame >= len(self.replay)
+
+
+class BotInput:
+    """
+    ゲームの状態を読んで動く自動操作ボット（無人での長時間テスト・バランス調整用）
+    近くの敵弾・敵から離れるように動き、危険がなければ狙う相手（ボスか一番近い敵）の真下へ寄る
+    （近接型は弾が届く距離まで近づく）
+    Zは押しっぱなし（チャージ型は溜まりきったら離して撃つ）
+    """
+    def mask(self, game:Game) -> int:
+        player = game.player
+        px, py = player.rect.center
+        mask = 0
+        if not (isinstance(player, PlayerCharge) and player.charge_time >= player.max_charge):
+            mask |= KEY_BITS[pygame.K_z]
+
+        # 近くの敵弾・敵から受ける「押し返し」を距離の二乗に反比例させて足し合わせる
+        bullets = game.enemy_bullets
+        n = bullets.count
+        xs = bullets.x[:n][(bullets.flags[:n] & FLAG_ALIVE) != 0] - px
+        ys = bullets.y[:n][(bullets.flags[:n] & FLAG_ALIVE) != 0] - py
+        others = [e.rect.center for e in game.enemies] + [b.rect.center for b in game.boss_group]
+        if others:
+            xs = np.concatenate((xs, np.array([x for x, _ in others], dtype=np.float32) - px))
+            ys = np.concatenate((ys, np.array([y for _, y in others], dtype=np.float32) - py))
+        d2 = xs * xs + ys * ys
+        near = d2 < BOT_DANGER_RADIUS * BOT_DANGER_RADIUS
+        if near.any():
+            w = 1.0 / (d2[near] + 1.0)
+            dx = -float((xs[near] * w).sum())
+            dy = -float((ys[near] * w).sum())
+            dead_zone = 0.0
+        else:
+            target = next(iter(game.boss_group), None)
+            if target is None and game.enemies:
+                target = min(game.enemies, key=lambda e: abs(e.rect.centerx - px))
+            dx = target.rect.centerx - px if target is not None else 0
+            if target is not None and isinstance(player, PlayerMelee):
+                dy = target.rect.bottom + BOT_MELEE_GAP - py
+            else:
+                dy = 1 if py < SCREEN_HEIGHT - 120 else 0 # 普段は画面下のほうにいる
+            dead_zone = 4 # 狙いがほぼ合っていれば左右にぶれない
+
+        if dx < -dead_zone:
+            mask |= KEY_BITS[pygame.K_LEFT]
+        elif dx > dead_zone:
+            mask |= KEY_BITS[pygame.K_RIGHT]
+        if dy < 0:
+            mask |= KEY_BITS[pygame.K_UP]
+        elif dy > 0:
+            mask |= KEY_BITS[pygame.K_DOWN]
+        return mask
+
+    def finished(self, game:Game) -> bool:
+        return False
@@ -0,0 +1,208 @@
+"""
+爆発・ヒットのパーティクル
+パーティクルは Sprite にせず、あらかじめ確保した固定長の配列（リングバッファ）でまとめて動かし、まとめて描く
+一杯になったら古いものから上書きして再利用するので、数が増えても配列の確保は起きない
+1フレームに出せる数 (emit_budget) と総数 (capacity) に上限があるので、弾消しやボス戦で大量に出しても
+1フレームあたりの処理量は一定以下に収まる
+
+見た目だけの演出なので、ゲームの乱数とは別の乱数を使い、ゲームの展開には影響しない
+"""
+import numpy as np
+import pygame
+
+# 同時に存在できるパーティクルの数
+PARTICLE_CAPACITY = 2048
+
+# 1フレームに新しく出せるパーティクルの数（超えた分は出さない）
+PARTICLE_EMIT_BUDGET = 256
+
+# パーティクルの大きさ(px)（寿命の後半は1px小さくする）
+PARTICLE_SIZE = 3
+
+# 1フレームごとに速度に掛ける減衰率
+PARTICLE_DRAG = 0.92
+
+# 出してから k フレーム後に、最初の速度の何倍の距離だけ進んでいるか（1 + d + d^2 + ... + d^(k-1)）
+# 位置は描くときにこの表から求めるので、毎フレームの更新は寿命を減らすだけで済む
+DRIFT_TABLE = ((1.0 - PARTICLE_DRAG ** np.arange(256)) / (1.0 - PARTICLE_DRAG)).astype(np.float32)
+
+# パーティクル画像のキャッシュ {(色, 大きさ): Surface}
+_images = {}
+
+
+def particle_image(color:tuple, size:int) -> pygame.Surface:
+    """
+    パーティクルの画像（色・大きさごとに一度だけ作って使い回す）
+    引数 color: 色
+    引数 size: 大きさ(px)
+    """
+    key = (color, size)
+    image = _images.get(key)
+    if image is None:
+        image = pygame.Surface((size, size))
+        image.fill(color)
+        _images[key] = image
+    return image
+
+
+class ParticleArray:
+    """
+    パーティクルを固定長の配列でまとめて管理するクラス
+    出した位置・最初の速度・残り寿命・色番号を配列で持ち、出すときは書き込み位置を一周させて古いものから上書きする
+    """
+    def __init__(self, capacity:int=PARTICLE_CAPACITY, emit_budget:int=PARTICLE_EMIT_BUDGET) -> None:
+        """
+        引数 capacity: 同時に存在できるパーティクルの数
+        引数 emit_budget: 1フレームに新しく出せるパーティクルの数
+        """
+        self.capacity = capacity
+        self.emit_budget = emit_budget
+        self.origin = np.zeros((2, capacity), dtype=np.float32) # 出した位置 (x, y)
+        self.vel = np.zeros((2, capacity), dtype=np.float32)    # 最初の速度 (vx, vy)
+        self.life = np.zeros(capacity, dtype=np.int32)     # 残り寿命（フレーム数）。0以下なら空き
+        self.max_life = np.ones(capacity, dtype=np.int32)  # 出したときの寿命
+        self.color = np.zeros(capacity, dtype=np.uint8)    # colors の添字
+        self.colors = []    # 使った色（色番号の表）
+        self.head = 0       # 次に書き込む位置（ここが一番古い）
+        self.emitted = 0    # このフレームに出した数
+        self.remaining = 0  # 全パーティクルが消えるまでのフレーム数（0なら更新も描画もしない）
+        self.drawn = []     # 前回 draw(track=True) で描いた矩形（clear() で消す）
+        self.rng = np.random.default_rng()
+
+    def reset(self, seed:int | None=None) -> None:
+        """
+        全パーティクルを消し、見た目の乱数を初期化する
+        引数 seed: 乱数シード
+        """
+        self.life[:] = 0
+        self.head = 0
+        self.emitted = 0
+        self.remaining = 0
+        self.rng = np.random.default_rng(seed)
+
+    def burst(self, x, y, count:int, speed:float, life:int, color:tuple) -> int:
+        """
+        点 (x, y) から全方向へパーティクルを飛び散らせる
+        x, y に配列を渡すと、それぞれの点から count 個ずつまとめて出す（弾消しなど）
+        引数 x,y: 出す位置（数値または配列）
+        引数 count: 1点あたりの数
+        引数 speed: 最大の速さ(px/フレーム)（0〜speed でばらつかせる）
+        引数 life: 寿命（フレーム数）（半分〜life でばらつかせる）
+        引数 color: 色
+        戻り値: 実際に出した数（このフレームの上限を超えた分は出さない）
+        """
+        points = np.size(x)
+        n = min(points * count, self.emit_budget - self.emitted, self.capacity)
+        if n <= 0:
+            return 0
+        if color not in self.colors:
+            self.colors.append(color)
+        # 向き・速さ・寿命の乱数を1回でまとめて作る
+        r = self.rng.random((3, n), dtype=np.float32)
+        r[0] *= np.float32(2 * np.pi)
+        r[1] *= np.float32(speed)
+        vel = np.empty((2, n), dtype=np.float32)
+        np.cos(r[0], out=vel[0])
+        np.sin(r[0], out=vel[1])
+        vel *= r[1]
+        life = min(life, len(DRIFT_TABLE) - 1)
+        shortest = max(1, life // 2)
+        lives = (shortest + r[2] * (life - shortest + 1)).astype(np.int32)
+        np.minimum(lives, life, out=lives)
+        if points > 1:
+            xy = np.repeat(np.array((x, y), dtype=np.float32), count, axis=1)[:, :n]
+        else:
+            xy = np.array((x, y), dtype=np.float32).reshape(2, 1)
+
+        # 書き込み位置から n 個分（配列の終わりを越えたら先頭に戻って残りを書く）
+        head = self.head
+        first = min(n, self.capacity - head)
+        self._write(slice(head, head + first), slice(0, first), xy, vel, lives, color)
+        if first < n:
+            self._write(slice(0, n - first), slice(first, n), xy, vel, lives, color)
+        self.head = (head + n) % self.capacity
+        self.emitted += n
+        self.remaining = max(self.remaining, life)
+        return n
+
+    def _write(self, dst:slice, src:slice, xy:np.ndarray, vel:np.ndarray, lives:np.ndarray, color:tuple) -> None:
+        """
+        burst() で作った値の src の範囲を、配列の dst の範囲に書き込む
+        """
+        self.origin[:, dst] = xy if xy.shape[1] == 1 else xy[:, src]
+        self.vel[:, dst] = vel[:, src]
+        self.life[dst] = lives[src]
+        self.max_life[dst] = lives[src]
+        self.color[dst] = self.colors.index(color)
+
+    def update(self) -> None:
+        """
+        全パーティクルの寿命をまとめて1フレーム分減らす（配列の長さは一定なので処理量も一定）
+        """
+        self.emitted = 0
+        if self.remaining == 0:
+            return
+        self.remaining -= 1
+        self.life -= 1
+
+    def draw(self, surface:pygame.Surface, track:bool=False, alpha:float=1.0, atlas=None) -> list:
+        """
+        生きているパーティクルをまとめて描画する（寿命の後半は小さい画像で描く）
+        引数 surface: 描画先
+        引数 track: 描いた範囲を覚えて返すか（差分描画用）
+        引数 alpha: 1フレーム前の位置(0)から今の位置(1)までのどこに描くか
+        引数 atlas: 指定すると画像をこのアトラス (atlas.SpriteAtlas) から切り出して描く
+        戻り値: track=True なら前回と今回描いた矩形のリスト
+        """
+        index = np.flatnonzero(self.life > 0) if self.remaining else self.life[:0]
+        if index.size == 0:
+            if not track:
+                return [] # 記録を取らない描画（スクリーンショットなど）では、次に消す範囲を忘れない
+            dirty = self.drawn
+            self.drawn = []
+            return dirty
+        life = self.life[index]
+        max_life = self.max_life[index]
+        age = max_life - life
+        drift = DRIFT_TABLE[age]
+        if alpha < 1.0:
+            # 出したフレームのもの(age=0)はまだ動いていないので戻さない
+            drift = drift - (drift - DRIFT_TABLE[np.maximum(age - 1, 0)]) * np.float32(1.0 - alpha)
+        x = self.origin[0, index] + self.vel[0, index] * drift
+        y = self.origin[1, index] + self.vel[1, index] * drift
+        half = PARTICLE_SIZE // 2
+        left = (np.rint(x) - half).astype(np.int32).tolist()
+        top = (np.rint(y) - half).astype(np.int32).tolist()
+        # 画像の番号: 色番号 * 2 + (寿命の後半なら1)
+        small = life * 2 <= max_life
+        kinds = (self.color[index].astype(np.int32) * 2 + small).tolist()
+        images = [particle_image(color, PARTICLE_SIZE - s) for color in self.colors for s in (0, 1)]
+        if atlas is not None:
+            atlas.add(images) # 新しい色があればここでアトラスを作り直す
+            sheet = atlas.surface
+            areas = [atlas.rects[image] for image in images]
+            seq = [(sheet, pos, areas[k]) for pos, k in zip(zip(left, top), kinds)]
+        else:
+            seq = [(images[k], pos) for pos, k in zip(zip(left, top), kinds)]
+        if not track:
+            surface.blits(seq, False)
+            return []
+        rects = surface.blits(seq)
+        dirty = self.drawn + rects
+        self.drawn = rects
+        return dirty
+
+    def clear(self, surface:pygame.Surface, background:pygame.Surface) -> None:
+        """
+        前回 draw(track=True) で描いたパーティクルを背景で消す
+        引数 surface: 描画先
+        引数 background: 背景画像
+        """
+        if self.drawn:
+            surface.blits([(background, rect, rect) for rect in self.drawn], False)
+
+    def __len__(self) -> int:
+        """
+        生きているパーティクルの数
+        """
+        return int(np.count_nonzero(self.life > 0)) if self.remaining else 0
@@ -0,0 +1,235 @@
+import json
+import sys
+import time
+from array import array
+from collections import deque
+
+import pygame
+
+# メインループの処理段階（この順に計測する）
+PHASES = ("events", "update", "collision", "draw", "hud", "overlay", "flip")
+
+# オーバーレイの表示色
+PHASE_COLORS = {
+    "events": (150, 150, 150),
+    "update": (80, 200, 255),
+    "collision": (255, 120, 80),
+    "draw": (120, 255, 120),
+    "hud": (255, 220, 80),
+    "overlay": (200, 120, 255),
+    "flip": (255, 255, 255),
+}
+
+
+def percentile(values:list, p:float) -> float:
+    """
+    パーセンタイル値を返す（線形補間）
+    引数 values: 値の列
+    引数 p: 0〜100
+    """
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = (len(s) - 1) * p / 100
+    i = int(k)
+    if i + 1 >= len(s):
+        return s[-1]
+    return s[i] + (s[i + 1] - s[i]) * (k - i)
+
+
+class FrameStats:
+    """
+    メインループの各段階の処理時間と、エンティティ数・メモリ確保数をフレームごとに記録するクラス
+    """
+    def __init__(self, enabled:bool=True, window:int=120) -> None:
+        """
+        引数 enabled: 起動時から全フレームを記録するか（Falseでもオーバーレイ表示中は記録する）
+        引数 window: オーバーレイの移動平均・最悪値に使う直近フレーム数
+        """
+        self.enabled = enabled
+        self.overlay = False # オーバーレイ表示中か
+        # 直近 window フレーム分（オーバーレイ表示用）
+        self.recent = {name: deque(maxlen=window) for name in PHASES + ("frame",)}
+        self.recent_counts = {}
+        # サンプルは array に貯めて、記録そのものがPythonオブジェクトを確保しないようにする
+        self.phases = {name: array("d") for name in PHASES} # 段階ごとの処理時間(ms)
+        self.frames = array("d")                            # 1フレーム全体の処理時間(ms)
+        self.counts = {}                                    # {グループ名: [フレームごとの数]}
+        self.alloc_blocks = array("q")                      # フレーム中に増えたメモリブロック数
+        self._current = dict.fromkeys(PHASES, 0.0)
+        self._start = 0.0
+        self._last = 0.0
+        self._blocks = sys.getallocatedblocks()
+
+    @property
+    def active(self) -> bool:
+        """
+        計測中かどうか（計測していないフレームは何もしない）
+        """
+        return self.enabled or self.overlay
+
+    def toggle_overlay(self) -> None:
+        """
+        オーバーレイの表示を切り替える
+        """
+        self.overlay = not self.overlay
+
+    def begin_frame(self) -> None:
+        """
+        フレームの計測を始める
+        """
+        if not self.active:
+            return
+        self._start = self._last = time.perf_counter()
+        for name in PHASES:
+            self._current[name] = 0.0
+
+    def mark(self, phase:str) -> None:
+        """
+        前回の mark（またはフレーム開始）からここまでを phase の時間として記録する
+        引数 phase: 段階名 (PHASES のどれか)
+        """
+        if not self.active:
+            return
+        now = time.perf_counter()
+        self._current[phase] += (now - self._last) * 1000
+        self._last = now
+
+    def end_frame(self, **counts:int) -> None:
+        """
+        フレームの計測を終える
+        引数 counts: このフレームのエンティティ数（例: enemies=10）
+        """
+        if not self.active:
+            return
+        frame = (time.perf_counter() - self._start) * 1000
+        self.frames.append(frame)
+        self.recent["frame"].append(frame)
+        for name in PHASES:
+            self.phases[name].append(self._current[name])
+            self.recent[name].append(self._current[name])
+        for name, value in counts.items():
+            samples = self.counts.get(name)
+            if samples is None:
+                samples = self.counts[name] = array("q")
+            samples.append(value)
+        self.recent_counts = counts
+        blocks = sys.getallocatedblocks()
+        self.alloc_blocks.append(blocks - self._blocks)
+        self._blocks = blocks
+
+    def summary(self) -> dict:
+        """
+        p50/p95/p99 などの集計結果を返す
+        """
+        def stats(values):
+            return {
+                "mean": sum(values) / len(values) if values else 0.0,
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": max(values) if values else 0.0,
+            }
+        return {
+            "frames": len(self.frames),
+            "frame_ms": stats(self.frames),
+            "phases_ms": {name: stats(values) for name, values in self.phases.items()},
+            "counts": {name: {"mean": sum(v) / len(v), "max": max(v)} for name, v in self.counts.items() if v},
+            "alloc_blocks": {
+                "per_frame_mean": sum(self.alloc_blocks) / len(self.alloc_blocks) if self.alloc_blocks else 0.0,
+                "per_frame_max": max(self.alloc_blocks) if self.alloc_blocks else 0,
+                "growth": sum(self.alloc_blocks),
+            },
+        }
+
+    def dump(self, path:str) -> None:
+        """
+        集計結果と全サンプルをJSONで書き出す
+        引数 path: 保存先のファイル
+        """
+        data = {
+            "summary": self.summary(),
+            "samples": {
+                "frame_ms": self.frames.tolist(),
+                "phases_ms": {name: values.tolist() for name, values in self.phases.items()},
+                "counts": {name: values.tolist() for name, values in self.counts.items()},
+                "alloc_blocks": self.alloc_blocks.tolist(),
+            },
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+class ProfilerOverlay:
+    """
+    FrameStats の直近の計測結果を画面に重ねて表示するクラス
+    処理段階ごとに移動平均の棒と最悪値の目盛り、グループごとのエンティティ数を表示する
+    """
+    def __init__(self, x:int=10, y:int=80, refresh:int=15) -> None:
+        """
+        引数 x,y: 表示位置
+        引数 refresh: 文字を描き直す間隔（フレーム数）
+        """
+        self.x = x
+        self.y = y
+        self.refresh = refresh
+        self.font = pygame.font.Font(None, 18)
+        self.scale = 8       # 1ms あたりの棒の長さ(px)
+        self.row_height = 16
+        self.labels = []     # 描画済みの文字 [(Surface, (x, y))]
+        self.bars = []       # [(色, 平均の長さ, 最悪値の位置)]
+        self.frame = 0
+        rows = len(PHASES) + 2
+        self.panel = pygame.Surface((300, rows * self.row_height + 10))
+        self.panel.set_alpha(180)
+        self.panel.fill((0, 0, 0))
+        self.rect = self.panel.get_rect(topleft=(x, y)) # 表示領域
+
+    def _rebuild(self, stats:FrameStats) -> None:
+        """
+        表示する文字と棒の長さを作り直す
+        """
+        def avg(values):
+            return sum(values) / len(values) if values else 0.0
+
+        self.labels = []
+        self.bars = []
+        top = self.y + 5
+        frame = stats.recent["frame"]
+        frame_avg = avg(frame)
+        fps = 1000 / frame_avg if frame_avg > 0 else 0
+        text = f"frame avg {frame_avg:5.2f}ms  worst {max(frame, default=0):5.2f}ms  ({fps:.0f} fps)"
+        self.labels.append((self.font.render(text, True, (255, 255, 255)), (self.x + 5, top)))
+        for i, name in enumerate(PHASES):
+            values = stats.recent[name]
+            mean = avg(values)
+            worst = max(values, default=0.0)
+            row = top + (i + 1) * self.row_height
+            label = self.font.render(f"{name:<9}{mean:6.2f} /{worst:6.2f}", True, PHASE_COLORS[name])
+            self.labels.append((label, (self.x + 5, row)))
+            self.bars.append((PHASE_COLORS[name], row, int(mean * self.scale), int(worst * self.scale)))
+        counts = "  ".join(f"{name}:{value}" for name, value in stats.recent_counts.items())
+        row = top + (len(PHASES) + 1) * self.row_height
+        self.labels.append((self.font.render(counts, True, (200, 200, 200)), (self.x + 5, row)))
+
+    def draw(self, surface:pygame.Surface, stats:FrameStats) -> None:
+        """
+        オーバーレイを描画する
+        引数 surface: 描画先
+        引数 stats: 計測結果
+        """
+        if self.frame % self.refresh == 0:
+            self._rebuild(stats)
+        self.frame += 1
+
+        surface.blit(self.panel, (self.x, self.y))
+        bar_x = self.x + 150
+        limit = self.panel.get_width() - 155
+        for color, row, mean, worst in self.bars:
+            pygame.draw.rect(surface, color, (bar_x, row + 3, min(mean, limit), self.row_height - 6))
+            pygame.draw.line(surface, (255, 0, 0), (bar_x + min(worst, limit), row + 1), (bar_x + min(worst, limit), row + self.row_height - 2))
+        # 60FPSの1フレーム分の予算の位置
+        budget = bar_x + int(1000 / 60 * self.scale)
+        pygame.draw.line(surface, (100, 100, 100), (budget, self.y), (budget, self.y + self.panel.get_height()))
+        for image, pos in self.labels:
+            surface.blit(image, pos)
@@ -0,0 +1,122 @@
+import pygame
+
+# 更新範囲がこれより多いときは、まとめて画面全体を更新する方が速い
+MAX_DIRTY_RECTS = 300
+
+
+class FullRenderer:
+    """
+    毎フレーム画面全体を塗りつぶして描き直し、flip() で全体を更新する描画方式（標準）
+    """
+    def __init__(self, screen:pygame.Surface, background:tuple) -> None:
+        """
+        引数 screen: 描画先の画面
+        引数 background: 背景色
+        """
+        self.screen = screen
+        self.background = background
+        self.track_dirty = False # 描画した範囲を集める必要があるか
+
+    def begin(self, key:tuple, dynamic:bool) -> bool:
+        """
+        フレームの描画を始める
+        引数 key: 画面の内容を表す値（静止画面で変化を判定するのに使う）
+        引数 dynamic: 毎フレーム内容が変わる画面か
+        戻り値: 描画する必要があるか
+        """
+        self.screen.fill(self.background)
+        return True
+
+    def add_dirty(self, rects:list) -> None:
+        """
+        描画した範囲を登録する（全画面更新なので何もしない）
+        """
+        pass
+
+    def invalidate(self) -> None:
+        """
+        次のフレームで画面全体を描き直させる（ウィンドウが再表示されたときなど）
+        """
+        pass
+
+    def present(self) -> None:
+        """
+        描画内容を画面に反映する
+        """
+        pygame.display.flip()
+
+
+class DirtyRenderer(FullRenderer):
+    """
+    変化した範囲だけを描き直して更新する描画方式（--renderer dirty）
+    静止画面（タイトル・キャラ選択・ゲームオーバー）は内容が変わったときだけ描き直し、
+    プレイ中はスプライトの前回位置と今回位置、HUDの領域だけを display.update() する
+    """
+    def __init__(self, screen:pygame.Surface, background:tuple, layers:list, regions:list) -> None:
+        """
+        引数 screen: 描画先の画面
+        引数 background: 背景色
+        引数 layers: 前回描画した位置を消せるもの（clear(surface, bg) を持つグループや弾ストア）
+        引数 regions: 毎フレーム描き直す固定領域（HUDなど）
+        """
+        super().__init__(screen, background)
+        self.track_dirty = True
+        self.bg_surface = pygame.Surface(screen.get_size())
+        self.bg_surface.fill(background)
+        self.layers = layers
+        self.regions = regions
+        self.key = None
+        self.full = True # 次のフレームは画面全体を描き直す
+        self.skipped = False
+        self.rects = []
+
+    def begin(self, key:tuple, dynamic:bool) -> bool:
+        """
+        フレームの描画を始める
+        画面の内容(key)が変わったら全体を描き直し、静止画面で変化がなければ何もしない
+        """
+        if key != self.key:
+            self.key = key
+            self.full = True
+        elif not dynamic and not self.full:
+            self.skipped = True
+            return False
+        self.skipped = False
+
+        if self.full:
+            self.screen.blit(self.bg_surface, (0, 0))
+            return True
+        # 前回描いたスプライトと固定領域を背景で消す
+        for layer in self.layers:
+            layer.clear(self.screen, self.bg_surface)
+        for rect in self.regions:
+            self.screen.blit(self.bg_surface, rect, rect)
+            self.rects.append(rect)
+        return True
+
+    def invalidate(self) -> None:
+        """
+        次のフレームで画面全体を描き直させる（ウィンドウが再表示されたときなど）
+        """
+        self.full = True
+
+    def add_dirty(self, rects:list) -> None:
+        """
+        描画した範囲を登録する
+        引数 rects: 更新が必要な矩形のリスト
+        """
+        if not self.full:
+            self.rects.extend(rects)
+
+    def present(self) -> None:
+        """
+        変化した範囲だけを画面に反映する
+        """
+        if self.skipped:
+            return
+        if self.full or len(self.rects) > MAX_DIRTY_RECTS:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.rects)
+        self.full = False
+        self.rects = []
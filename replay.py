@@ -0,0 +1,109 @@
+import struct
+import zlib
+
+import pygame
+
+# キー入力のビット割り当て（1フレーム1バイト）
+KEY_BITS = {
+    pygame.K_LEFT: 0x01,
+    pygame.K_RIGHT: 0x02,
+    pygame.K_UP: 0x04,
+    pygame.K_DOWN: 0x08,
+    pygame.K_LSHIFT: 0x10, # 左右のShiftは同じビット
+    pygame.K_RSHIFT: 0x10,
+    pygame.K_z: 0x20,
+    pygame.K_x: 0x40,
+    pygame.K_c: 0x80,
+}
+
+# ファイル形式: ヘッダ(マジック, バージョン, 乱数シード, キャラ番号, フレーム数) + zlib圧縮したマスク列
+MAGIC = b"STGR"
+VERSION = 1
+HEADER = struct.Struct("<4sHqHI")
+
+
+def keys_to_mask(keys) -> int:
+    """
+    pygame.key.get_pressed() の結果をビットマスクに変換する
+    引数 keys: キーの押下状態
+    """
+    mask = 0
+    for key, bit in KEY_BITS.items():
+        if keys[key]:
+            mask |= bit
+    return mask
+
+
+class MaskKeys:
+    """
+    ビットマスクを pygame.key.get_pressed() と同じように keys[pygame.K_z] で読めるようにするクラス
+    """
+    def __init__(self, mask:int) -> None:
+        """
+        引数 mask: キー入力のビットマスク
+        """
+        self.mask = mask
+
+    def __getitem__(self, key:int) -> bool:
+        return bool(self.mask & KEY_BITS.get(key, 0))
+
+
+class Recorder:
+    """
+    乱数シードと毎フレームのキー入力を記録してファイルに保存するクラス
+    """
+    def __init__(self, path:str, seed:int, char_idx:int) -> None:
+        """
+        引数 path: 保存先のファイル
+        引数 seed: ゲーム開始時の乱数シード
+        引数 char_idx: 選択したキャラ（CHAR_LISTの添字）
+        """
+        self.path = path
+        self.seed = seed
+        self.char_idx = char_idx
+        self.masks = bytearray()
+
+    def append(self, mask:int) -> None:
+        """
+        1フレーム分の入力を記録する
+        引数 mask: キー入力のビットマスク
+        """
+        self.masks.append(mask)
+
+    def save(self) -> None:
+        """
+        記録をファイルに書き出す
+        """
+        with open(self.path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.char_idx, len(self.masks)))
+            f.write(zlib.compress(bytes(self.masks), 9))
+
+
+class Replay:
+    """
+    Recorder で保存したファイルを読み込み、フレームごとの入力を返すクラス
+    """
+    def __init__(self, path:str) -> None:
+        """
+        引数 path: 読み込むファイル
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, self.seed, self.char_idx, frames = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} はリプレイファイルではありません")
+        self.masks = zlib.decompress(data[HEADER.size:])
+        if len(self.masks) != frames:
+            raise ValueError(f"{path} のフレーム数が一致しません")
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def get(self, frame:int) -> int:
+        """
+        指定フレームの入力を返す（記録が尽きたら入力なし）
+        引数 frame: ゲーム開始からのフレーム番号
+        """
+        if frame < len(self.masks):
+            return self.masks[frame]
+        return 0
@@ -0,0 +1,184 @@
+"""
+長時間の無人テスト（ソークテスト）
+自動操作ボット (inputs.BotInput) が CHAR_LIST のキャラを順番にヘッドレスで長時間プレイし続け、
+一定フレームごとに step() の処理時間・敵弾の数・ボスのレベル・メモリ確保数を記録する
+ボスのレベルが上がるにつれてフレーム時間の予算(1000/FPS ms)を超えるようになっていないか、
+メモリが増え続けていないかを調べ、見つかったら終了コード 1 を返す
+
+標準では被弾してもゲームオーバーにせず、ボスのレベルが上がり続けるようにする
+（--mortal を付けるとゲームオーバーのたびに次の乱数シードで最初からやり直す）
+
+--track-alloc を付けると alloc_tracker でクラスごとの生存インスタンス数と Surface の作成数も数え、
+予算（--budget で変更できる）を超えたら失敗にする（--tracemalloc でそのときメモリが増えた行も表示する）
+
+使い方:
+    python soak.py --minutes 60
+    python soak.py --chars 3 6 --minutes 10 --window 1800 --mortal
+    python soak.py --minutes 10 --track-alloc --budget Bullet=500 --budget surfaces_per_frame=2 --tracemalloc
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from alloc_tracker import DEFAULT_BUDGETS, AllocTracker
+from game import CHAR_LIST, FPS, Bullet, Game
+from inputs import BotInput
+
+# フレーム時間の予算(ms)
+FRAME_BUDGET_MS = 1000 / FPS
+
+
+def soak_char(char_idx:int, seconds:float, max_frames:int, window:int, seed:int, mortal:bool,
+              tracker:AllocTracker | None=None, trace:bool=False) -> tuple:
+    """
+    1キャラ分のソークテストを行い、window フレームごとの記録を返す
+    引数 char_idx: キャラ番号
+    引数 seconds: 実行する実時間(秒)
+    引数 max_frames: 実行する最大フレーム数（0なら制限なし）
+    引数 window: 1行分の記録にまとめるフレーム数
+    引数 seed: 最初の乱数シード（やり直すたびに1ずつ増やす）
+    引数 mortal: 被弾でゲームオーバーにするか
+    引数 tracker: 計測を始めた AllocTracker（None なら生存数を数えない）
+    引数 trace: 予算を最初に超えたとき tracemalloc でメモリが増えた行を表示するか
+    戻り値: (記録（辞書）のリスト, 予算を超えたものの説明のリスト)
+    """
+    problems = []
+    if tracker is not None:
+        tracker.reset_peak()
+        if trace:
+            tracker.snapshot() # 最初の1回だけ基準になる
+    game = Game(invincible=not mortal)
+    game.reset(char_idx, seed)
+    bot = BotInput()
+    rows = []
+    step_ms = np.zeros(window)
+    bullets = np.zeros(window, dtype=np.int64)
+    total = 0
+    restarts = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline and (not max_frames or total < max_frames):
+        for i in range(window):
+            start = time.perf_counter()
+            over = game.step(bot.mask(game))
+            step_ms[i] = (time.perf_counter() - start) * 1000
+            bullets[i] = len(game.enemy_bullets)
+            if tracker is not None:
+                tracker.end_frame()
+            if over:
+                restarts += 1
+                game.reset(char_idx, seed + restarts)
+        total += window
+        rows.append({
+            "char": char_idx,
+            "frames": total,
+            "boss_level": game.boss_level,
+            "restarts": restarts,
+            "p50_ms": float(np.percentile(step_ms, 50)),
+            "p99_ms": float(np.percentile(step_ms, 99)),
+            "max_ms": float(step_ms.max()),
+            "over_budget": int(np.count_nonzero(step_ms > FRAME_BUDGET_MS)),
+            "bullets_max": int(bullets.max()),
+            "alloc_blocks": sys.getallocatedblocks(),
+            "bullet_pool": len(Bullet.pool),
+        })
+        print_row(rows[-1])
+        if tracker is not None:
+            census = tracker.census()
+            rows[-1]["live"] = {name: info["live"] for name, info in census.items()}
+            print_census(census, tracker.peak_surfaces)
+            over_budget = tracker.check(census)
+            if over_budget and not problems: # 最初に超えたときだけ報告する
+                name = CHAR_LIST[char_idx]["name"]
+                problems = [f"{name}: {total} フレーム目までに {p}" for p in over_budget]
+                if trace:
+                    for stat in tracker.snapshot():
+                        print(f"    {stat}")
+    return rows, problems
+
+
+def print_row(row:dict) -> None:
+    """
+    記録を1行表示する
+    """
+    print(f"{CHAR_LIST[row['char']]['name']:<18}{row['frames']:>9}{row['boss_level']:>5}{row['restarts']:>6}"
+          f"{row['p50_ms']:>8.3f}{row['p99_ms']:>8.3f}{row['max_ms']:>8.2f}{row['over_budget']:>6}"
+          f"{row['bullets_max']:>7}{row['alloc_blocks']:>10}{row['bullet_pool']:>7}", flush=True)
+
+
+def print_census(census:dict, peak_surfaces:int) -> None:
+    """
+    クラスごとの生存インスタンス数を1行表示する
+    """
+    parts = [f"{name}={info['live']}({info['bytes'] // 1024}KB)" for name, info in census.items()]
+    print(f"    生存: {' '.join(parts)} 弾プール={census['Bullet']['pooled']} Surface作成=最大{peak_surfaces}個/フレーム", flush=True)
+
+
+def parse_budget(text:str) -> tuple:
+    """
+    --budget の「名前=上限」を (名前, 上限) にする
+    """
+    name, sep, limit = text.partition("=")
+    if not sep or name not in DEFAULT_BUDGETS:
+        raise argparse.ArgumentTypeError(f"{text}: 名前=上限 の形で、名前は {', '.join(DEFAULT_BUDGETS)} のどれか")
+    return name, int(limit)
+
+
+def check(rows:list, leak_blocks:float) -> list:
+    """
+    処理落ちとメモリの増え続けを調べる
+    メモリ確保数は最初の1行（準備運動）を除いた後半の行に直線を当てはめ、1行あたりの増え方が leak_blocks を超えたら報告する
+    引数 rows: 1キャラ分の記録
+    引数 leak_blocks: 許容する1行あたりのメモリブロックの増加数
+    戻り値: 問題の説明のリスト
+    """
+    problems = []
+    name = CHAR_LIST[rows[0]["char"]]["name"]
+    slow = [r for r in rows if r["p99_ms"] > FRAME_BUDGET_MS]
+    if slow:
+        problems.append(f"{name}: p99 がフレーム時間の予算 {FRAME_BUDGET_MS:.1f}ms を超えた区間が {len(slow)} 個"
+                        f"（最初は {slow[0]['frames']} フレーム目、ボスLv{slow[0]['boss_level']}）")
+    tail = rows[max(1, len(rows) // 2):]
+    if len(tail) >= 3:
+        slope = np.polyfit([r["frames"] for r in tail], [r["alloc_blocks"] for r in tail], 1)[0] * (tail[1]["frames"] - tail[0]["frames"])
+        if slope > leak_blocks:
+            problems.append(f"{name}: メモリブロックが区間ごとに約 {slope:.0f} 個ずつ増え続けている")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="自動操作ボットによる長時間の無人テスト")
+    parser.add_argument("--chars", type=int, nargs="+", default=list(range(len(CHAR_LIST))), help="キャラ番号（省略時は全キャラ）")
+    parser.add_argument("--minutes", type=float, default=1.0, help="1キャラあたりの実行時間（分）")
+    parser.add_argument("--frames", type=int, default=0, help="1キャラあたりの最大フレーム数（0なら --minutes だけで止める）")
+    parser.add_argument("--window", type=int, default=FPS * 60, help="1行の記録にまとめるフレーム数")
+    parser.add_argument("--seed", type=int, default=0, help="最初の乱数シード")
+    parser.add_argument("--mortal", action="store_true", help="被弾したらゲームオーバーにして最初からやり直す")
+    parser.add_argument("--leak-blocks", type=float, default=1000, help="許容する1行あたりのメモリブロックの増加数")
+    parser.add_argument("--track-alloc", action="store_true", help="クラスごとの生存インスタンス数と Surface の作成数を数え、予算を超えたら失敗にする")
+    parser.add_argument("--budget", type=parse_budget, action="append", default=[], metavar="名前=上限",
+                        help=f"--track-alloc の予算を変える（標準: {' '.join(f'{k}={v}' for k, v in DEFAULT_BUDGETS.items())}）")
+    parser.add_argument("--tracemalloc", action="store_true", help="予算を超えたとき、メモリが増えた行を表示する（--track-alloc と一緒に使う）")
+    args = parser.parse_args()
+
+    tracker = None
+    if args.track_alloc:
+        tracker = AllocTracker(dict(args.budget))
+        tracker.install()
+
+    print(f"{'キャラ':<18}{'フレーム':>9}{'Lv':>5}{'再開':>6}{'p50ms':>8}{'p99ms':>8}{'最大ms':>8}{'超過':>6}"
+          f"{'最大敵弾':>7}{'確保ブロック':>10}{'弾プール':>7}")
+    problems = []
+    for char_idx in args.chars:
+        rows, over_budget = soak_char(char_idx, args.minutes * 60, args.frames, args.window, args.seed, args.mortal,
+                                      tracker, args.tracemalloc)
+        problems += check(rows, args.leak_blocks) + over_budget
+
+    for problem in problems:
+        print(problem)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import pygame
+
+# 空間ハッシュのセルの大きさ(px)
+CELL_SIZE = 64
+
+# 判定する組の数（問い合わせるスプライトの数 × 相手の数）がこれ未満なら、ハッシュを作らずに
+# pygame の総当たり判定を使う（数が少ないとハッシュを作る手間のほうが大きい。bench_collision.py で測った損益分岐点）
+BRUTE_FORCE_PAIRS = 10000
+
+
+class SpatialHash:
+    """
+    一様グリッドによる空間ハッシュ（衝突判定の広域判定用）
+    グループごとにスプライトの矩形が重なるセルへ登録し、
+    問い合わせ矩形の周辺セルにいるスプライトだけを矩形判定する
+    判定する組が少ないときはハッシュを作らず pygame の総当たり判定を使う（グループのハッシュは必要になったときに作る）
+    結果は pygame.sprite.spritecollide / groupcollide と同じ内容・同じ順序になる
+    """
+    def __init__(self, cell_size:int=CELL_SIZE, brute_force_pairs:int=BRUTE_FORCE_PAIRS) -> None:
+        """
+        空間ハッシュの設定
+        引数 cell_size: セルの一辺の長さ(px)
+        引数 brute_force_pairs: 判定する組の数がこれ未満なら総当たり判定を使う（0なら常にハッシュを使う）
+        """
+        self.cell_size = cell_size
+        self.brute_force_pairs = brute_force_pairs
+        self.layers = {} # {グループ: {(cx, cy): [(登録順, スプライト), ...]}}（None はまだ作っていない）
+
+    def rebuild(self, *groups:pygame.sprite.AbstractGroup) -> None:
+        """
+        前のフレームのハッシュを捨て、これから判定するグループを登録する（毎フレーム、判定の直前に呼ぶ）
+        各グループのハッシュは、総当たりより速くなる問い合わせが最初に来たときに、その時点の位置で作る
+        引数 groups: 登録するグループ
+        """
+        self.layers = dict.fromkeys(groups)
+
+    def _build(self, group:pygame.sprite.AbstractGroup) -> dict:
+        """
+        グループのスプライトを、矩形が重なるセルへ登録したハッシュを作る
+        引数 group: 登録するグループ
+        戻り値: {(cx, cy): [(登録順, スプライト), ...]}
+        """
+        cs = self.cell_size
+        cells = {}
+        for order, sprite in enumerate(group):
+            r = sprite.rect
+            x0 = r.left // cs
+            x1 = max(r.right - 1, r.left) // cs
+            y0 = r.top // cs
+            y1 = max(r.bottom - 1, r.top) // cs
+            entry = (order, sprite)
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    bucket = cells.get((cx, cy))
+                    if bucket is None:
+                        cells[(cx, cy)] = [entry]
+                    else:
+                        bucket.append(entry)
+        self.layers[group] = cells
+        return cells
+
+    def _use_hash(self, group:pygame.sprite.AbstractGroup, queries:int) -> bool:
+        """
+        問い合わせにハッシュを使うか（作り済みか、判定する組の数が総当たりの上限以上なら使う）
+        引数 group: 相手のグループ（rebuild で登録済みであること）
+        引数 queries: 問い合わせるスプライトの数
+        """
+        return self.layers[group] is not None or queries * len(group) >= self.brute_force_pairs
+
+    def query(self, rect:pygame.Rect, group:pygame.sprite.AbstractGroup) -> list:
+        """
+        矩形と重なっているスプライトを登録順で返す
+        引数 rect: 判定する矩形
+        引数 group: 探索するグループ（rebuild 済みであること）
+        """
+        cells = self.layers[group]
+        if cells is None:
+            cells = self._build(group)
+        if not cells:
+            return []
+        cs = self.cell_size
+        x0 = rect.left // cs
+        x1 = max(rect.right - 1, rect.left) // cs
+        y0 = rect.top // cs
+        y1 = max(rect.bottom - 1, rect.top) // cs
+        found = {}
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    for order, sprite in bucket:
+                        if order not in found and rect.colliderect(sprite.rect):
+                            found[order] = sprite
+        if len(found) > 1:
+            return [found[k] for k in sorted(found)]
+        return list(found.values())
+
+    def spritecollide(self, sprite:pygame.sprite.Sprite, group:pygame.sprite.AbstractGroup, dokill:bool, collided=None) -> list:
+        """
+        pygame.sprite.spritecollide の空間ハッシュ版
+        引数 sprite: 判定するスプライト
+        引数 group: 相手のグループ
+        引数 dokill: 当たった相手を消すかどうか
+        引数 collided: rect が重なった相手だけに使う詳細判定 collided(sprite, 相手)（省略時は rect の重なりだけ）
+        """
+        if not self._use_hash(group, 1):
+            return pygame.sprite.spritecollide(sprite, group, dokill, _rect_then(collided))
+        # 判定中に消された相手はハッシュに残っているので、グループに居るものだけ返す
+        hits = [s for s in self.query(sprite.rect, group) if s in group]
+        if collided is not None:
+            hits = [s for s in hits if collided(sprite, s)]
+        if dokill:
+            for s in hits:
+                s.kill()
+        return hits
+
+    def groupcollide(self, groupa:pygame.sprite.AbstractGroup, groupb:pygame.sprite.AbstractGroup, dokilla:bool, dokillb:bool) -> dict:
+        """
+        pygame.sprite.groupcollide の空間ハッシュ版（groupb が rebuild 済みであること）
+        引数 groupa, groupb: 判定するグループ
+        引数 dokilla, dokillb: 当たったスプライトを消すかどうか
+        """
+        if not self._use_hash(groupb, len(groupa)):
+            return pygame.sprite.groupcollide(groupa, groupb, dokilla, dokillb)
+        if self.layers[groupb] is None:
+            self._build(groupb) # 以降の spritecollide はこのハッシュを使う
+        crashed = {}
+        for sprite in groupa.sprites():
+            collision = self.spritecollide(sprite, groupb, dokillb)
+            if collision:
+                crashed[sprite] = collision
+                if dokilla:
+                    sprite.kill()
+        return crashed
+
+
+def _rect_then(collided):
+    """
+    rect が重なった相手だけに詳細判定 collided を使う判定関数を返す（pygame.sprite.spritecollide に渡す形）
+    引数 collided: 詳細判定 collided(sprite, 相手)（None なら rect の重なりだけ）
+    """
+    if collided is None:
+        return None
+    return lambda a, b: a.rect.colliderect(b.rect) and collided(a, b)
+
+
+class PointGrid:
+    """
+    スプライトの中心点を一様グリッドに登録し、最も近いものを探すクラス（誘導弾の索敵用）
+    問い合わせ点のセルから外側へ1周ずつ探し、残りの周にそれより近い点がありえなくなったら打ち切る
+    距離が同じときは登録順で先のものを返す（リストを先頭から線形探索したときと同じ結果）
+    """
+    def __init__(self, cell_size:int=128) -> None:
+        """
+        引数 cell_size: セルの一辺の長さ(px)
+        """
+        self.cell_size = cell_size
+        self.cells = {} # {(cx, cy): [(登録順, x, y, スプライト), ...]}
+        self.bounds = None # 登録されたセルの範囲 (cx0, cy0, cx1, cy1)
+
+    def rebuild(self, sprites) -> None:
+        """
+        スプライトの現在の中心位置でグリッドを作り直す
+        引数 sprites: 登録するスプライト（この順が登録順になる）
+        """
+        cs = self.cell_size
+        cells = {}
+        for order, sprite in enumerate(sprites):
+            x, y = sprite.rect.center
+            key = (x // cs, y // cs)
+            entry = (order, x, y, sprite)
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [entry]
+            else:
+                bucket.append(entry)
+        self.cells = cells
+        if cells:
+            xs = [cx for cx, _ in cells]
+            ys = [cy for _, cy in cells]
+            self.bounds = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            self.bounds = None
+
+    def nearest(self, x:float, y:float) -> pygame.sprite.Sprite | None:
+        """
+        (x, y) に最も近いスプライトを返す（登録がなければ None）
+        引数 x,y: 問い合わせ点
+        """
+        if self.bounds is None:
+            return None
+        cs = self.cell_size
+        cx = int(x // cs)
+        cy = int(y // cs)
+        bx0, by0, bx1, by1 = self.bounds
+        max_ring = max(abs(cx - bx0), abs(cx - bx1), abs(cy - by0), abs(cy - by1))
+        cells = self.cells
+        best = None
+        best_key = None
+        ring = 0
+        while ring <= max_ring:
+            for key in self._ring_cells(cx, cy, ring):
+                bucket = cells.get(key)
+                if bucket:
+                    for order, px, py, sprite in bucket:
+                        dx = px - x
+                        dy = py - y
+                        k = (dx * dx + dy * dy, order)
+                        if best_key is None or k < best_key:
+                            best_key = k
+                            best = sprite
+            # 次の周より外の点は問い合わせ点から ring * cs 以上離れている
+            if best_key is not None and best_key[0] <= (ring * cs) ** 2:
+                break
+            ring += 1
+        return best
+
+    @staticmethod
+    def _ring_cells(cx:int, cy:int, ring:int):
+        """
+        (cx, cy) からチェビシェフ距離がちょうど ring のセルを列挙する
+        """
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for x in range(cx - ring, cx + ring + 1):
+            yield (x, cy - ring)
+            yield (x, cy + ring)
+        for y in range(cy - ring + 1, cy + ring):
+            yield (cx - ring, y)
+            yield (cx + ring, y)
@@ -0,0 +1,171 @@
+"""
+バランス調整用の一括シミュレーション
+キャラ × ボスレベル × 乱数シード × 入力（固定入力 or 自動操作ボット）の組み合わせを
+プロセスプールで全CPUコアに振り分けてヘッドレスで実行し、条件ごとの集計表を出す
+
+集計する指標:
+    生存時間（ゲームオーバーまでのフレーム数）、最初のボスの撃破時間、
+    1分あたりのスコア、敵弾の最大数
+
+使い方:
+    python sweep.py --seeds 20
+    python sweep.py --chars 2 3 6 --boss-levels 1 5 10 --inputs bot --seeds 50 --out sweep.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from bench import make_input
+from game import CHAR_LIST, FPS, Game
+from inputs import BotInput
+
+# 入力の種類（"fire", "fire_sweep" は bench.make_input の固定入力、"bot" は自動操作 inputs.BotInput）
+INPUTS = ("fire", "fire_sweep", "bot")
+
+
+def run_one(job:tuple) -> dict:
+    """
+    1回分のシミュレーションを実行して結果を返す（ワーカープロセスで呼ばれる）
+    引数 job: (キャラ番号, ボスレベル, 乱数シード, 入力の種類, 最大フレーム数)
+    """
+    char_idx, boss_level, seed, input_kind, max_frames = job
+    game = Game(boss_level=boss_level)
+    game.reset(char_idx, seed)
+    bot = BotInput() if input_kind == "bot" else None
+    masks = None if bot is not None else make_input(input_kind, max_frames)
+
+    peak_bullets = 0
+    boss_kills = 0
+    boss_spawn_frame = None
+    first_kill_frames = None
+    while game.frame < max_frames:
+        was_boss_active = game.is_boss_active
+        mask = bot.mask(game) if bot is not None else masks[game.frame]
+        over = game.step(mask)
+        if not was_boss_active and game.is_boss_active:
+            boss_spawn_frame = game.frame
+        elif was_boss_active and not game.is_boss_active:
+            boss_kills += 1
+            if first_kill_frames is None:
+                first_kill_frames = game.frame - boss_spawn_frame
+        peak_bullets = max(peak_bullets, len(game.enemy_bullets))
+        if over:
+            break
+
+    minutes = game.frame / FPS / 60
+    return {
+        "char": char_idx,
+        "boss_level": boss_level,
+        "seed": seed,
+        "input": input_kind,
+        "frames": game.frame,
+        "survived": not game.game_over,
+        "score": game.score,
+        "score_per_min": game.score / minutes if minutes else 0.0,
+        "boss_kills": boss_kills,
+        "first_boss_kill_frames": first_kill_frames,
+        "peak_bullets": peak_bullets,
+    }
+
+
+def _init_worker() -> None:
+    """
+    ワーカープロセスの初期化
+    Game は画面なしで動くので pygame.init() はしない（SDLがSIGTERMを握ってプールを終了できなくなる）
+    """
+    # 画像が見つからないときの警告などが実行回数分だけ並ぶので、ワーカーの標準出力は捨てる
+    sys.stdout = open(os.devnull, "w")
+
+
+def aggregate(runs:list) -> list:
+    """
+    (キャラ, ボスレベル, 入力) ごとに結果をまとめる
+    引数 runs: run_one の結果のリスト
+    戻り値: 集計行のリスト
+    """
+    groups = {}
+    for run in runs:
+        groups.setdefault((run["char"], run["boss_level"], run["input"]), []).append(run)
+    table = []
+    for (char_idx, boss_level, input_kind), rows in sorted(groups.items()):
+        kills = [r["first_boss_kill_frames"] for r in rows if r["first_boss_kill_frames"] is not None]
+        table.append({
+            "char": char_idx,
+            "name": CHAR_LIST[char_idx]["name"],
+            "boss_level": boss_level,
+            "input": input_kind,
+            "runs": len(rows),
+            "survival_rate": sum(r["survived"] for r in rows) / len(rows),
+            "survival_sec": sum(r["frames"] for r in rows) / len(rows) / FPS,
+            "boss_kill_rate": len(kills) / len(rows),
+            "boss_kill_sec": sum(kills) / len(kills) / FPS if kills else None,
+            "score_per_min": sum(r["score_per_min"] for r in rows) / len(rows),
+            "peak_bullets": max(r["peak_bullets"] for r in rows),
+        })
+    return table
+
+
+def print_table(table:list) -> None:
+    """
+    集計表を表示する
+    引数 table: aggregate の結果
+    """
+    print(f"{'キャラ':<18}{'Lv':>4} {'入力':<11}{'回数':>5}{'生存率':>8}{'生存秒':>8}{'撃破率':>8}{'撃破秒':>8}{'スコア/分':>10}{'最大弾数':>8}")
+    for row in table:
+        kill_sec = f"{row['boss_kill_sec']:.1f}" if row["boss_kill_sec"] is not None else "-"
+        print(f"{row['name']:<18}{row['boss_level']:>4} {row['input']:<11}{row['runs']:>5}"
+              f"{row['survival_rate']:>8.0%}{row['survival_sec']:>8.1f}{row['boss_kill_rate']:>8.0%}{kill_sec:>8}"
+              f"{row['score_per_min']:>10.0f}{row['peak_bullets']:>8}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="バランス調整用の一括シミュレーション")
+    parser.add_argument("--chars", type=int, nargs="+", default=list(range(len(CHAR_LIST))), help="キャラ番号（CHAR_LISTの添字、省略時は全キャラ）")
+    parser.add_argument("--boss-levels", type=int, nargs="+", default=[1, 3, 5], help="開始時に出現させるボスのレベル")
+    parser.add_argument("--seeds", type=int, default=10, help="条件ごとの実行回数（乱数シード 0〜N-1）")
+    parser.add_argument("--inputs", nargs="+", choices=INPUTS, default=list(INPUTS), help="入力の種類")
+    parser.add_argument("--frames", type=int, default=FPS * 60, help="1回の最大フレーム数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="ワーカープロセス数")
+    parser.add_argument("--out", metavar="FILE", help="全実行の結果と集計表のJSONの保存先")
+    args = parser.parse_args()
+
+    jobs = [(c, level, seed, kind, args.frames)
+            for c in args.chars for level in args.boss_levels for kind in args.inputs for seed in range(args.seeds)]
+    # 重い条件がひとつのワーカーに偏らないよう順番を混ぜ、まとめて渡してプロセス間通信を減らす
+    random.Random(0).shuffle(jobs)
+    chunksize = max(1, len(jobs) // (args.workers * 8))
+
+    start = time.perf_counter()
+    runs = []
+    pool = multiprocessing.Pool(args.workers, initializer=_init_worker)
+    try:
+        for run in pool.imap_unordered(run_one, jobs, chunksize):
+            runs.append(run)
+            if len(runs) % 100 == 0:
+                print(f"{len(runs)}/{len(jobs)}", file=sys.stderr)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    elapsed = time.perf_counter() - start
+
+    table = aggregate(runs)
+    print_table(table)
+    frames = sum(r["frames"] for r in runs)
+    print(f"{len(runs)} runs / {frames} frames / {elapsed:.1f}s ({frames / max(elapsed, 1e-9):.0f} frames/s, {args.workers} workers)")
+
+    if args.out:
+        runs.sort(key=lambda r: (r["char"], r["boss_level"], r["input"], r["seed"]))
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"table": table, "runs": runs}, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+プレイの記録（テレメトリ）
+ザコ敵の出現・撃破、ボスの出現・攻撃開始・撃破、フレームごとの弾の数と処理時間などを
+固定長（16バイト）のバイナリレコードとして、メモリマップしたリングバッファのファイルに書き込む
+1件の記録は struct.pack_into 2回（レコードと総数）だけなので、毎フレーム書いてもほとんど負荷にならない
+ファイルが一杯になったら古い記録から上書きする（直近 capacity 件が残る）
+
+書き込み:
+    python shoot.py --telemetry play.tlm
+
+読み込み（集計表と1秒ごとの時系列を表示）:
+    python telemetry.py play.tlm
+    python telemetry.py play.tlm --csv play.csv
+"""
+import argparse
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+# ファイルの先頭: 識別子, 版, レコード数の上限, これまでに書いた総レコード数
+HEADER = struct.Struct("<4sIIQ")
+MAGIC = b"STLM"
+VERSION = 1
+
+# 1件のレコード: フレーム番号, イベントの種類, 補助の値(敵の種類など), 整数の値, 小数の値
+RECORD = struct.Struct("<IBBxxif")
+RECORD_DTYPE = np.dtype([("frame", "<u4"), ("kind", "u1"), ("arg", "u1"), ("pad", "<u2"), ("a", "<i4"), ("b", "<f4")])
+
+# レコード数の上限の標準（16バイト × 65536件 = 1MB）
+DEFAULT_CAPACITY = 1 << 16
+
+# イベントの種類
+EV_SESSION = 1    # ゲーム開始       arg: キャラ番号, a: 乱数シード
+EV_FRAME = 2      # フレームの終わり a: 敵弾の数, b: そのフレームの処理時間(ms)
+EV_SPAWN = 3      # ザコ敵の出現     arg: 敵の種類 (ENEMY_TYPE_*)
+EV_KILL = 4       # ザコ敵の撃破     arg: 敵の種類
+EV_BOSS_SPAWN = 5 # ボスの出現       a: ボスのレベル
+EV_BOSS_PHASE = 6 # ボスの攻撃開始   a: ボスのレベル
+EV_BOSS_KILL = 7  # ボスの撃破       a: ボスのレベル
+EV_GAME_OVER = 8  # ゲームオーバー   a: スコア
+
+EVENT_NAMES = {
+    EV_SESSION: "開始",
+    EV_FRAME: "フレーム",
+    EV_SPAWN: "ザコ出現",
+    EV_KILL: "ザコ撃破",
+    EV_BOSS_SPAWN: "ボス出現",
+    EV_BOSS_PHASE: "ボス攻撃開始",
+    EV_BOSS_KILL: "ボス撃破",
+    EV_GAME_OVER: "ゲームオーバー",
+}
+
+
+class Telemetry:
+    """
+    テレメトリのレコードをメモリマップしたリングバッファのファイルに書き込むクラス
+    """
+    def __init__(self, path:str, capacity:int=DEFAULT_CAPACITY) -> None:
+        """
+        ファイルを作り直して書き込みを始める
+        引数 path: 保存先
+        引数 capacity: 保存するレコード数の上限
+        """
+        self.capacity = capacity
+        self.total = 0 # これまでに書いた総レコード数
+        size = HEADER.size + RECORD.size * capacity
+        with open(path, "wb") as f:
+            f.truncate(size)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), size)
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, capacity, 0)
+
+    def log(self, frame:int, kind:int, arg:int=0, a:int=0, b:float=0.0) -> None:
+        """
+        レコードを1件書き込む
+        引数 frame: ゲームのフレーム番号
+        引数 kind: イベントの種類 (EV_*)
+        引数 arg: 補助の値（0〜255）
+        引数 a: 整数の値
+        引数 b: 小数の値
+        """
+        total = self.total
+        RECORD.pack_into(self._map, HEADER.size + RECORD.size * (total % self.capacity), frame, kind, arg, a, b)
+        self.total = total + 1
+        # 総数はヘッダの末尾の8バイト。途中で落ちてもここまでの記録は読める
+        struct.pack_into("<Q", self._map, HEADER.size - 8, total + 1)
+
+    def close(self) -> None:
+        """
+        書き込みを終える（内容はファイルに残る）
+        """
+        if self._map is None:
+            return
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+        self._map = None
+
+
+def read_records(path:str) -> np.ndarray:
+    """
+    テレメトリのファイルを読み込み、古い順に並べたレコードの構造化配列を返す
+    引数 path: ファイルのパス
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, capacity, total = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} はテレメトリのファイルではありません")
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=capacity, offset=HEADER.size)
+    if total <= capacity:
+        return records[:total]
+    start = total % capacity
+    return np.concatenate((records[start:], records[:start]))
+
+
+def split_sessions(records:np.ndarray) -> list:
+    """
+    レコードをゲーム開始 (EV_SESSION) ごとに分ける
+    （リングバッファが一周して最初の開始が消えている場合は、先頭の断片も1つのセッションとして返す）
+    """
+    starts = np.flatnonzero(records["kind"] == EV_SESSION).tolist()
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    bounds = starts + [len(records)]
+    return [records[s:e] for s, e in zip(bounds, bounds[1:]) if e > s]
+
+
+def summarize(session:np.ndarray, fps:int) -> dict:
+    """
+    1セッション分のレコードを集計する
+    引数 session: split_sessions の要素
+    引数 fps: 1秒あたりのフレーム数（時系列の区切りに使う）
+    戻り値: 集計結果の辞書
+    """
+    kind = session["kind"]
+    frames = session[kind == EV_FRAME]
+    spawns = session[kind == EV_SPAWN]
+    kills = session[kind == EV_KILL]
+    head = session[0]
+    result = {
+        "char": int(head["arg"]) if head["kind"] == EV_SESSION else None,
+        "seed": int(head["a"]) if head["kind"] == EV_SESSION else None,
+        "frames": int(frames["frame"].max()) + 1 if len(frames) else 0,
+        "events": {EVENT_NAMES.get(k, str(k)): int(c) for k, c in zip(*np.unique(kind, return_counts=True))},
+        "spawns_by_type": {int(t): int(c) for t, c in zip(*np.unique(spawns["arg"], return_counts=True))},
+        "kills_by_type": {int(t): int(c) for t, c in zip(*np.unique(kills["arg"], return_counts=True))},
+        "boss": [(EVENT_NAMES[int(r["kind"])], int(r["a"]), int(r["frame"]))
+                 for r in session[np.isin(kind, (EV_BOSS_SPAWN, EV_BOSS_PHASE, EV_BOSS_KILL))]],
+    }
+    if len(frames):
+        ms = frames["b"].astype(np.float64)
+        result["frame_ms"] = {
+            "p50": float(np.percentile(ms, 50)),
+            "p95": float(np.percentile(ms, 95)),
+            "p99": float(np.percentile(ms, 99)),
+            "max": float(ms.max()),
+        }
+        result["enemy_bullets_max"] = int(frames["a"].max())
+
+    # 1秒ごとの時系列（出現数・撃破数・敵弾の最大数・処理時間の最大値）
+    seconds = result["frames"] // fps + 1 if result["frames"] else 0
+    series = np.zeros(seconds, dtype=[("sec", "i4"), ("spawns", "i4"), ("kills", "i4"), ("bullets_max", "i4"), ("frame_ms_max", "f4")])
+    if seconds:
+        series["sec"] = np.arange(seconds)
+        np.add.at(series["spawns"], spawns["frame"] // fps, 1)
+        np.add.at(series["kills"], kills["frame"] // fps, 1)
+        sec = frames["frame"] // fps
+        np.maximum.at(series["bullets_max"], sec, frames["a"])
+        np.maximum.at(series["frame_ms_max"], sec, frames["b"])
+    result["series"] = series
+    return result
+
+
+def print_summary(index:int, result:dict) -> None:
+    """
+    集計結果を表示する
+    引数 index: セッションの番号
+    引数 result: summarize の結果
+    """
+    print(f"=== セッション {index}: キャラ={result['char']} シード={result['seed']} フレーム数={result['frames']}")
+    print("イベント数: " + ", ".join(f"{name}={count}" for name, count in result["events"].items()))
+    types = sorted(set(result["spawns_by_type"]) | set(result["kills_by_type"]))
+    if types:
+        print(f"{'敵の種類':>8}{'出現':>8}{'撃破':>8}")
+        for t in types:
+            print(f"{t:>8}{result['spawns_by_type'].get(t, 0):>8}{result['kills_by_type'].get(t, 0):>8}")
+    for name, level, frame in result["boss"]:
+        print(f"  {frame:>7}F  {name} (Lv{level})")
+    if "frame_ms" in result:
+        ms = result["frame_ms"]
+        print(f"フレーム時間: p50={ms['p50']:.2f}ms p95={ms['p95']:.2f}ms p99={ms['p99']:.2f}ms 最大={ms['max']:.2f}ms"
+              f" / 敵弾の最大数={result['enemy_bullets_max']}")
+    series = result["series"]
+    if len(series):
+        print(f"{'秒':>5}{'出現':>6}{'撃破':>6}{'最大敵弾':>10}{'最大ms':>9}")
+        for row in series:
+            print(f"{row['sec']:>5}{row['spawns']:>6}{row['kills']:>6}{row['bullets_max']:>10}{row['frame_ms_max']:>9.2f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="テレメトリのファイルを集計する")
+    parser.add_argument("path", help="shoot.py --telemetry で書き出したファイル")
+    parser.add_argument("--fps", type=int, default=60, help="1秒あたりのフレーム数（時系列の区切り）")
+    parser.add_argument("--csv", metavar="FILE", help="全セッションの1秒ごとの時系列をCSVで書き出す")
+    args = parser.parse_args()
+
+    records = read_records(args.path)
+    if len(records) == 0:
+        print("記録がありません")
+        return 0
+    results = [summarize(session, args.fps) for session in split_sessions(records)]
+    for i, result in enumerate(results):
+        print_summary(i, result)
+
+    if args.csv:
+        with open(args.csv, "w", encoding="utf-8") as f:
+            f.write("session,sec,spawns,kills,bullets_max,frame_ms_max\n")
+            for i, result in enumerate(results):
+                for row in result["series"]:
+                    f.write(f"{i},{row['sec']},{row['spawns']},{row['kills']},{row['bullets_max']},{row['frame_ms_max']:.3f}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+固定刻みのシミュレーションの進め方を決めるスケジューラ
+描画のフレームレートとは切り離して、実時間に合わせた回数だけ Game.step() を進める
+描画が間に合わなかったフレームの次は複数回まとめて進め（描画を飛ばす）、
+端数は alpha（前回と今回の状態の間の位置）として描画の補間に使う
+
+使い方:
+    timestep = FixedTimestep(1000 / FPS)
+    while running:
+        for _ in range(timestep.advance(経過時間ms)):
+            game.step(mask)
+        game.render(screen, alpha=timestep.alpha)
+"""
+
+# 1回の描画の間に進めるシミュレーションの最大回数
+# これを超えて遅れた分は捨てる（処理落ちが続いても遅れを取り戻そうとして止まらなくなるのを防ぐ）
+MAX_STEPS_PER_FRAME = 5
+
+
+class FixedTimestep:
+    """
+    実時間の経過を貯めて、固定刻みのシミュレーションを何回進めるかを決めるクラス
+    """
+    def __init__(self, step_ms:float, max_steps:int=MAX_STEPS_PER_FRAME) -> None:
+        """
+        引数 step_ms: シミュレーション1回分の時間(ms)
+        引数 max_steps: 1回の描画の間に進める最大回数
+        """
+        self.step_ms = step_ms
+        self.max_steps = max_steps
+        self.accumulator = 0.0 # まだシミュレーションに使っていない時間(ms)
+        self.dropped_ms = 0.0  # 遅れすぎて捨てた時間の合計(ms)
+        self.skipped = 0       # 飛ばした描画の回数（2回以上進めたフレームの、余分に進めた回数の合計）
+
+    def reset(self) -> None:
+        """
+        貯まった時間を捨てる（ゲーム開始時やメニューから戻ったときに、止まっていた間の分を一気に進めないようにする）
+        """
+        self.accumulator = 0.0
+
+    def advance(self, elapsed_ms:float) -> int:
+        """
+        経過時間を貯めて、今回進めるシミュレーションの回数を返す
+        引数 elapsed_ms: 前回の呼び出しからの実時間(ms)
+        戻り値: 進める回数（0〜max_steps）
+        """
+        self.accumulator += elapsed_ms
+        steps = int(self.accumulator // self.step_ms)
+        if steps > self.max_steps:
+            self.dropped_ms += (steps - self.max_steps) * self.step_ms
+            steps = self.max_steps
+            self.accumulator %= self.step_ms
+        else:
+            self.accumulator -= steps * self.step_ms
+        if steps > 1:
+            self.skipped += steps - 1
+        return steps
+
+    @property
+    def alpha(self) -> float:
+        """
+        最後に進めたシミュレーションから次までの間のどこにいるか（0〜1、描画の補間に使う）
+        """
+        return min(self.accumulator / self.step_ms, 1.0)